@@ -0,0 +1,168 @@
+"""
+Turnaround Analytics for StudentHub
+Every status transition is appended to request_status_events, and the
+durations it completes (submitted -> ready, ready -> collected) are added to
+daily per-type histograms in turnaround_rollups. Reports read only the
+rollups, so a month of any request type is at most a few hundred rows
+"""
+
+from datetime import date, datetime, timedelta
+from sqlalchemy import delete, func, insert, select, union_all, update
+from models import get_model, insert_if_missing
+
+_HOUR = 3600
+_DAY = 24 * _HOUR
+
+# Upper bounds (seconds) of the duration buckets; one overflow bucket follows
+DURATION_BUCKETS = (
+    15 * 60, 30 * 60, _HOUR, 2 * _HOUR, 4 * _HOUR, 8 * _HOUR, 12 * _HOUR,
+    _DAY, 2 * _DAY, 3 * _DAY, 4 * _DAY, 5 * _DAY, 7 * _DAY, 10 * _DAY,
+    14 * _DAY, 21 * _DAY, 30 * _DAY, 60 * _DAY
+)
+
+
+def bucket_index(seconds):
+    """Index of the first bucket whose upper bound covers `seconds`"""
+    for index, bound in enumerate(DURATION_BUCKETS):
+        if seconds <= bound:
+            return index
+    return len(DURATION_BUCKETS)
+
+
+def record_events(conn, db, events):
+    """Append status events (dicts of RequestStatusEvent columns) in one executemany"""
+    if events:
+        conn.execute(insert(get_model(db, 'RequestStatusEvent').__table__), events)
+
+
+def record_durations(conn, db, samples):
+    """Add (day, request_type, metric, seconds) samples to the daily rollups"""
+    totals = {}
+    for day, request_type, metric, seconds in samples:
+        seconds = max(0.0, seconds)
+        key = (day, request_type, metric, bucket_index(seconds))
+        count, total = totals.get(key, (0, 0.0))
+        totals[key] = (count + 1, total + seconds)
+
+    table = get_model(db, 'TurnaroundRollup').__table__
+    for (day, request_type, metric, bucket), (count, total) in totals.items():
+        match = ((table.c.day == day) & (table.c.request_type == request_type)
+                 & (table.c.metric == metric) & (table.c.bucket == bucket))
+        bump = update(table).where(match).values(count=table.c.count + count,
+                                                 total_seconds=table.c.total_seconds + total)
+        if conn.execute(bump).rowcount == 0:
+            insert_if_missing(conn, table, {
+                'day': day, 'request_type': request_type, 'metric': metric,
+                'bucket': bucket, 'count': 0, 'total_seconds': 0.0
+            }, keys=['day', 'request_type', 'metric', 'bucket'])
+            conn.execute(bump)
+
+
+def transition_samples(row, new_status, now):
+    """Durations completed by moving `row` (with submitted_at/ready_at/collected_at) to `new_status`"""
+    samples = []
+    reaches_ready = new_status in ('Ready', 'Collected')
+    if reaches_ready and row.ready_at is None and row.submitted_at is not None:
+        samples.append((now.date(), row.request_type, 'submit_to_ready',
+                        (now - row.submitted_at).total_seconds()))
+    if new_status == 'Collected' and row.collected_at is None:
+        ready_at = row.ready_at or now
+        samples.append((now.date(), row.request_type, 'ready_to_collected',
+                        (now - ready_at).total_seconds()))
+    return samples
+
+
+def percentile_from_buckets(counts, fraction, totals=None):
+    """Estimate a percentile from bucket counts by interpolating inside the bucket
+
+    With per-bucket sums, values are taken as spread evenly around the
+    bucket's mean rather than across its whole width.
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    rank = fraction * total
+    seen = 0
+    for index, count in enumerate(counts):
+        if count and seen + count >= rank:
+            lower = DURATION_BUCKETS[index - 1] if index else 0
+            upper = DURATION_BUCKETS[index] if index < len(DURATION_BUCKETS) else None
+            if totals is not None:
+                spread = 2 * (totals[index] / count) - lower
+                upper = spread if upper is None else min(upper, spread)
+            if upper is None or upper <= lower:
+                return float(lower)
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return float(DURATION_BUCKETS[-1])
+
+
+def turnaround_summary(db, start_day, end_day, request_type=None):
+    """{request_type: {metric: {count, mean, p50, p90}}} for days in [start_day, end_day]"""
+    table = get_model(db, 'TurnaroundRollup').__table__
+    query = (
+        select(table.c.request_type, table.c.metric, table.c.bucket,
+               func.sum(table.c.count), func.sum(table.c.total_seconds))
+        .where(table.c.day >= start_day, table.c.day <= end_day)
+        .group_by(table.c.request_type, table.c.metric, table.c.bucket)
+    )
+    if request_type:
+        query = query.where(table.c.request_type == request_type)
+
+    histograms = {}
+    for row_type, metric, bucket, count, total in db.session.execute(query):
+        entry = histograms.setdefault((row_type, metric), {
+            'counts': [0] * (len(DURATION_BUCKETS) + 1),
+            'totals': [0.0] * (len(DURATION_BUCKETS) + 1)
+        })
+        entry['counts'][bucket] += int(count)
+        entry['totals'][bucket] += float(total)
+
+    summary = {}
+    for (row_type, metric), entry in sorted(histograms.items()):
+        count = sum(entry['counts'])
+        summary.setdefault(row_type, {})[metric] = {
+            'count': count,
+            'mean': sum(entry['totals']) / count if count else None,
+            'p50': percentile_from_buckets(entry['counts'], 0.50, entry['totals']),
+            'p90': percentile_from_buckets(entry['counts'], 0.90, entry['totals'])
+        }
+    return summary
+
+
+def month_range(month=None):
+    """(first day, last day) of a 'YYYY-MM' month, defaulting to the current one"""
+    first = datetime.strptime(month, '%Y-%m').date() if month else date.today().replace(day=1)
+    following = (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return first, following - timedelta(days=1)
+
+
+def rebuild_rollups(db, batch_size=5000):
+    """Recompute every rollup from the requests' timestamps (live and archived); returns samples recorded"""
+    conn = db.session.connection()
+    conn.execute(delete(get_model(db, 'TurnaroundRollup').__table__))
+
+    finished = [
+        select(table.c.request_type, table.c.submitted_at, table.c.ready_at, table.c.collected_at)
+        .where(table.c.ready_at.is_not(None) | table.c.collected_at.is_not(None))
+        for table in (get_model(db, 'ServiceRequest').__table__, get_model(db, 'ArchivedRequest').__table__)
+    ]
+    rows = db.session.execute(union_all(*finished).execution_options(yield_per=batch_size))
+    recorded = 0
+    samples = []
+    for row in rows:
+        if row.ready_at is not None and row.submitted_at is not None:
+            samples.append((row.ready_at.date(), row.request_type, 'submit_to_ready',
+                            (row.ready_at - row.submitted_at).total_seconds()))
+        if row.collected_at is not None:
+            ready_at = row.ready_at or row.collected_at
+            samples.append((row.collected_at.date(), row.request_type, 'ready_to_collected',
+                            (row.collected_at - ready_at).total_seconds()))
+        if len(samples) >= batch_size:
+            record_durations(conn, db, samples)
+            recorded += len(samples)
+            samples = []
+    record_durations(conn, db, samples)
+    recorded += len(samples)
+    db.session.commit()
+    return recorded
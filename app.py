@@ -3,14 +3,26 @@ Railway Concession Management System
 Main Flask Application
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+import time
+_BOOT_STARTED = time.perf_counter()
+
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+from flask.cli import AppGroup
+import click
 from datetime import datetime
 import os
 import logging
 from config import Config
+from passwords import HashingBusy
+from identity import refresh_identity
+from engine_profile import install_engine_hooks, pool_status
+from metrics import install_metrics
+from pagecache import cached_page
+from assets import asset_url
+from livefeed import install_live_events
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -23,49 +35,37 @@ login_manager = LoginManager(app)
 login_manager.login_view = 'auth'  # Redirect to /auth when login required
 login_manager.login_message = 'Please log in to access this page.'
 
-# Initialize database and create tables (for production deployment)
+# Engine tuning and pool statistics (no I/O - the engine connects lazily)
 with app.app_context():
-    from models import init_models
-    Student, Worker, ServiceRequest = init_models(db)
-    db.create_all()
-    
-    # Create default worker if not exists
-    if not Worker.query.filter_by(employee_id='ADMIN001').first():
-        admin_default_password = os.environ.get('ADMIN_DEFAULT_PASSWORD', 'admin123')
-        admin_worker = Worker(
-            employee_id='ADMIN001',
-            email='admin@college.edu',
-            full_name='System Administrator',
-            department='Administration',
-            role='admin',
-            is_active=True
-        )
-        admin_worker.set_password(admin_default_password)
-        db.session.add(admin_worker)
-        db.session.commit()
+    install_engine_hooks(db.engine, app.config)
 
+# Per-request latency, SQL and template metrics (served on /metrics)
+install_metrics(app, db)
+
+# Request submissions and status changes pushed to open pages (/events/stream)
+install_live_events(db, app)
 
 # User loader for Flask-Login
 @login_manager.user_loader
 def load_user(user_id):
-    """Load user based on user type stored in session"""
+    """Load user based on user type stored in session (cached per process)"""
     from models import init_models
+    from identity import load_identity
     Student, Worker, _ = init_models(db)
     try:
         user_type = session.get('user_type')
+        if user_type not in ('student', 'worker'):
+            # Fallback: try student first, then worker
+            user_type = 'student' if db.session.get(Student, int(user_id)) else 'worker'
+            session['user_type'] = user_type
+        
         if user_type == 'student':
-            return db.session.get(Student, int(user_id))
-        elif user_type == 'worker':
-            return db.session.get(Worker, int(user_id))
-        # Fallback: try student first, then worker
-        user = db.session.get(Student, int(user_id))
-        if user:
-            session['user_type'] = 'student'
-            return user
-        user = db.session.get(Worker, int(user_id))
-        if user:
-            session['user_type'] = 'worker'
-            return user
+            return load_identity(db, Student, 'student', int(user_id))
+        
+        worker = load_identity(db, Worker, 'worker', int(user_id))
+        # Deactivated workers are signed out on their next request
+        if worker is not None and worker.is_active:
+            return worker
     except Exception:
         pass
     return None
@@ -80,7 +80,7 @@ def index():
             return redirect(url_for('student_dashboard'))
         elif session.get('user_type') == 'worker':
             return redirect(url_for('worker_dashboard'))
-    return render_template('index.html')
+    return cached_page('index.html')
 
 @app.route('/auth')
 def auth():
@@ -90,7 +90,7 @@ def auth():
             return redirect(url_for('student_dashboard'))
         elif session.get('user_type') == 'worker':
             return redirect(url_for('worker_dashboard'))
-    return render_template('auth.html')
+    return cached_page('auth.html')
 
 # ==================== AUTHENTICATION ROUTES ====================
 
@@ -172,16 +172,22 @@ def student_login():
         ).first()
         
         if student and student.check_password(password):
+            db.session.commit()  # Persist a transparently upgraded hash
             session.permanent = True  # Keep session alive across refreshes
             login_user(student, remember=True)
             session['user_type'] = 'student'
+            refresh_identity('student', student)
             flash('Login successful!', 'success')
             return redirect(url_for('student_dashboard'))
         else:
             flash('Invalid credentials!', 'error')
             return redirect(url_for('auth') + '?role=student')
             
+    except HashingBusy:
+        flash('The server is busy right now. Please try again in a moment.', 'error')
+        return redirect(url_for('auth') + '?role=student')
     except Exception as e:
+        db.session.rollback()
         app.logger.error(f'Student login error: {e}')
         flash('Login failed. Please try again.', 'error')
         return redirect(url_for('auth') + '?role=student')
@@ -261,16 +267,22 @@ def worker_login():
         ).first()
         
         if worker and worker.check_password(password) and worker.is_active:
+            db.session.commit()  # Persist a transparently upgraded hash
             session.permanent = True  # Keep session alive across refreshes
             login_user(worker, remember=True)
             session['user_type'] = 'worker'
+            refresh_identity('worker', worker)
             flash('Login successful!', 'success')
             return redirect(url_for('worker_dashboard'))
         else:
             flash('Invalid credentials or account inactive!', 'error')
             return redirect(url_for('auth') + '?role=worker')
             
+    except HashingBusy:
+        flash('The server is busy right now. Please try again in a moment.', 'error')
+        return redirect(url_for('auth') + '?role=worker')
     except Exception as e:
+        db.session.rollback()
         app.logger.error(f'Worker login error: {e}')
         flash('Login failed. Please try again.', 'error')
         return redirect(url_for('auth') + '?role=worker')
@@ -304,22 +316,32 @@ def my_requests():
         flash('Please log in as a student.', 'error')
         return redirect(url_for('auth') + '?role=student')
     
-    from models import init_models
-    Student, _, ServiceRequest = init_models(db)
-    
-    # Get all student's requests
-    requests = ServiceRequest.query.filter_by(student_id=current_user.id).order_by(
-        ServiceRequest.submitted_at.desc()
-    ).all()
-    
-    # Calculate statistics
-    total_requests = len(requests)
-    pending_requests = len([r for r in requests if r.status == 'In Progress'])
-    ready_requests = len([r for r in requests if r.status == 'Ready'])
-    collected_requests = len([r for r in requests if r.status == 'Collected'])
+    from models import init_models, get_model
+    from pagination import paginate_merged
+    from stats import get_request_stats
+    _, _, ServiceRequest = init_models(db)
+    ArchivedRequest = get_model(db, 'ArchivedRequest')
+
+    # Statistics from grouped queries over this student's live and archived requests
+    stats = get_request_stats(db, ServiceRequest, student_id=current_user.id, archive=ArchivedRequest)
+    by_status = stats['by_status']
+    total_requests = stats['total']
+    pending_requests = by_status.get('In Progress', 0)
+    ready_requests = by_status.get('Ready', 0)
+    collected_requests = by_status.get('Collected', 0)
+
+    # One keyset page of the student's requests, newest first (archived ones included)
+    page = paginate_merged(
+        [(ServiceRequest.query.filter_by(student_id=current_user.id), ServiceRequest),
+         (ArchivedRequest.query.filter_by(student_id=current_user.id), ArchivedRequest)],
+        app.config['REQUESTS_PAGE_SIZE'],
+        after=request.args.get('after'),
+        before=request.args.get('before')
+    )
     
     return render_template('my_requests.html',
-                         requests=requests,
+                         requests=page.items,
+                         page=page,
                          total_requests=total_requests,
                          pending_requests=pending_requests,
                          ready_requests=ready_requests,
@@ -333,7 +355,9 @@ def academic_calendar():
         flash('Please log in as a student.', 'error')
         return redirect(url_for('auth') + '?role=student')
     
-    return render_template('academic_calendar.html')
+    return cached_page('academic_calendar.html',
+                       full_name=current_user.full_name,
+                       roll_number=current_user.roll_number)
 
 @app.route('/student/faculty')
 @login_required
@@ -343,7 +367,12 @@ def faculty_details():
         flash('Please log in as a student.', 'error')
         return redirect(url_for('auth') + '?role=student')
     
-    return render_template('faculty_details.html')
+    return cached_page('faculty_details.html',
+                       full_name=current_user.full_name,
+                       roll_number=current_user.roll_number,
+                       department=current_user.department,
+                       year=current_user.year,
+                       division=current_user.division)
 
 @app.route('/student/apply/<service_type>')
 @login_required
@@ -413,13 +442,16 @@ def submit_application(service_type):
     
     from models import init_models
     import os
-    from werkzeug.utils import secure_filename
+    from storage import store_upload
+    from analytics import record_events
+    from livefeed import WORKERS, queue_event, request_payload
+    from quotas import check_quota, reserve_quota
     
     Student, _, ServiceRequest = init_models(db)
     
     try:
         # Handle file uploads
-        upload_folder = os.path.join(app.root_path, 'uploads')
+        upload_folder = app.config['UPLOAD_FOLDER']
         os.makedirs(upload_folder, exist_ok=True)
         
         ALLOWED_EXTENSIONS = app.config.get('ALLOWED_EXTENSIONS', {'pdf', 'jpg', 'jpeg', 'png'})
@@ -430,25 +462,31 @@ def submit_application(service_type):
 
         def save_file(file_field):
             if file_field and file_field.filename:
-                if not allowed_file(file_field.filename):
-                    raise ValueError(
-                        f"Invalid file type. Only {', '.join(ALLOWED_EXTENSIONS).upper()} files are allowed."
-                    )
-                filename = secure_filename(file_field.filename)
-                # Add timestamp to filename to make it unique
-                import time
-                timestamp = str(int(time.time()))
-                filename = f"{timestamp}_{filename}"
-                filepath = os.path.join(upload_folder, filename)
-                file_field.save(filepath)
-                return filename
+                # Stream into the content-addressed store (deduplicated)
+                return store_upload(db, file_field, upload_folder)
             return None
         
+        uploads = {field: request.files.get(field)
+                   for field in ('id_proof', 'photo', 'fee_receipt', 'additional_doc')}
+        
+        # Validate every file before storing any of them
+        for file_field in uploads.values():
+            if file_field and file_field.filename and not allowed_file(file_field.filename):
+                raise ValueError(
+                    f"Invalid file type. Only {', '.join(ALLOWED_EXTENSIONS).upper()} files are allowed."
+                )
+        
+        # Turn students away before storing anything once today's limit is reached
+        check_quota(db, service_type)
+        
         # Save uploaded files
-        id_proof_filename = save_file(request.files.get('id_proof'))
-        photo_filename = save_file(request.files.get('photo'))
-        fee_receipt_filename = save_file(request.files.get('fee_receipt'))
-        additional_doc_filename = save_file(request.files.get('additional_doc'))
+        id_proof_filename = save_file(uploads['id_proof'])
+        photo_filename = save_file(uploads['photo'])
+        fee_receipt_filename = save_file(uploads['fee_receipt'])
+        additional_doc_filename = save_file(uploads['additional_doc'])
+        
+        # Take one of today's slots (raises QuotaExceeded, a ValueError, when full)
+        reserve_quota(db.session.connection(), db, service_type)
         
         # Generate token number
         token = ServiceRequest.generate_token_number(service_type)
@@ -495,8 +533,20 @@ def submit_application(service_type):
             else:
                 service_request.remarks = general_remarks
         
-        # Save to database
+        # Save to database, opening the request's status history
         db.session.add(service_request)
+        db.session.flush()
+        record_events(db.session.connection(), db, [{
+            'request_id': service_request.id,
+            'request_type': service_type,
+            'from_status': None,
+            'to_status': 'Submitted',
+            'worker_id': None,
+            'occurred_at': service_request.submitted_at
+        }])
+        queue_event(db.session, WORKERS, 'request_submitted', request_payload(
+            service_request.id, token, service_type, 'Submitted',
+            submitted_at=service_request.submitted_at))
         db.session.commit()
         
         flash(f'Application submitted successfully! Your token number is: {token}', 'success')
@@ -504,7 +554,7 @@ def submit_application(service_type):
         
     except ValueError as e:
         db.session.rollback()
-        # ValueError is raised for invalid file types — show user-friendly message
+        # ValueError is raised for invalid file types and full daily quotas — show user-friendly message
         flash(str(e), 'error')
         return redirect(url_for('apply_service', service_type=service_type))
     except Exception as e:
@@ -520,7 +570,9 @@ def fee_receipts():
     if session.get('user_type') != 'student':
         flash('Please log in as a student.', 'error')
         return redirect(url_for('auth') + '?role=student')
-    return render_template('fee_receipts.html')
+    return cached_page('fee_receipts.html',
+                       full_name=current_user.full_name,
+                       roll_number=current_user.roll_number)
 
 @app.route('/student/request/<int:request_id>')
 @login_required
@@ -530,10 +582,9 @@ def request_details(request_id):
         flash('Please log in as a student.', 'error')
         return redirect(url_for('auth') + '?role=student')
     
-    from models import init_models
-    _, _, ServiceRequest = init_models(db)
+    from archive import find_request
     
-    service_request = db.session.get(ServiceRequest, request_id)
+    service_request = find_request(db, request_id)
     if service_request is None:
         from flask import abort
         abort(404)
@@ -608,6 +659,7 @@ def update_profile():
         current_user.phone_number = phone_number
         
         db.session.commit()
+        refresh_identity('student', current_user)
         
         flash('Profile updated successfully!', 'success')
         return redirect(url_for('student_profile'))
@@ -648,6 +700,7 @@ def change_password():
         # Update password
         current_user.set_password(new_password)
         db.session.commit()
+        refresh_identity('student', current_user)
         
         flash('Password changed successfully!', 'success')
         return redirect(url_for('student_profile'))
@@ -684,6 +737,7 @@ def update_worker_profile():
         current_user.full_name = full_name
         
         db.session.commit()
+        refresh_identity('worker', current_user)
         
         flash('Profile updated successfully!', 'success')
         return redirect(url_for('worker_profile'))
@@ -724,6 +778,7 @@ def worker_change_password():
         # Update password
         current_user.set_password(new_password)
         db.session.commit()
+        refresh_identity('worker', current_user)
         
         flash('Password changed successfully!', 'success')
         return redirect(url_for('worker_profile'))
@@ -744,20 +799,21 @@ def worker_dashboard():
         return redirect(url_for('auth') + '?role=worker')
     
     from models import init_models
+    from stats import get_request_stats
+    from quotas import remaining_capacity
     _, _, ServiceRequest = init_models(db)
-    
-    # Calculate statistics
-    all_requests = ServiceRequest.query.all()
-    total_requests = len(all_requests)
-    pending_requests = len([r for r in all_requests if r.status in ['Submitted', 'In Progress']])
-    ready_requests = len([r for r in all_requests if r.status == 'Ready'])
-    collected_requests = len([r for r in all_requests if r.status == 'Collected'])
-    
+
+    # Calculate statistics (single GROUP BY query)
+    stats = get_request_stats(db, ServiceRequest)
+    by_status = stats['by_status']
+    total_requests = stats['total']
+    pending_requests = by_status.get('Submitted', 0) + by_status.get('In Progress', 0)
+    ready_requests = by_status.get('Ready', 0)
+    collected_requests = by_status.get('Collected', 0)
+
     # Service-wise breakdown
-    service_counts = {}
-    for req in all_requests:
-        service_counts[req.request_type] = service_counts.get(req.request_type, 0) + 1
-    
+    service_counts = stats['by_type']
+
     # Recent requests (last 10)
     recent_requests = ServiceRequest.query.order_by(
         ServiceRequest.submitted_at.desc()
@@ -769,7 +825,8 @@ def worker_dashboard():
                          ready_requests=ready_requests,
                          collected_requests=collected_requests,
                          service_counts=service_counts,
-                         recent_requests=recent_requests)
+                         recent_requests=recent_requests,
+                         capacity=remaining_capacity(db))
 
 @app.route('/worker/requests')
 @login_required
@@ -780,39 +837,97 @@ def worker_requests():
         return redirect(url_for('auth') + '?role=worker')
     
     from models import init_models
-    _, _, ServiceRequest = init_models(db)
-    
+    from pagination import KeysetPage, paginate_requests, get_page_size
+    from search import apply_request_filters
+    from archive import archived_by_ids
+    from sqlalchemy.orm import joinedload, load_only
+    Student, _, ServiceRequest = init_models(db)
+
     # Get filter parameters
     search_query = request.args.get('search', '').strip()
     service_filter = request.args.get('service', '')
     status_filter = request.args.get('status', '')
     
-    # Base query
-    query = ServiceRequest.query
+    # Base query - only the columns the table shows, student joined in the same SELECT
+    query = ServiceRequest.query.options(
+        load_only(ServiceRequest.token_number, ServiceRequest.request_type, ServiceRequest.status,
+                  ServiceRequest.submitted_at, ServiceRequest.student_id),
+        joinedload(ServiceRequest.student).load_only(Student.full_name, Student.roll_number)
+    )
     
-    # Apply search
-    if search_query:
-        query = query.filter(
-            (ServiceRequest.token_number.ilike(f'%{search_query}%'))
-        )
-    
-    # Apply service filter
-    if service_filter:
-        query = query.filter(ServiceRequest.request_type == service_filter)
-    
-    # Apply status filter
-    if status_filter:
-        query = query.filter(ServiceRequest.status == status_filter)
-    
-    # Get all requests ordered by newest first
-    requests = query.order_by(ServiceRequest.submitted_at.desc()).all()
+    # Apply search (ranked lookup in the search index), service and status filters
+    query, ranked_ids = apply_request_filters(db, query, Student, ServiceRequest,
+                                              search_query, service_filter, status_filter,
+                                              limit=app.config['SEARCH_MAX_RESULTS'])
     
+    if ranked_ids is not None:
+        # Search results are a bounded window shown in rank order, archived matches included
+        rank = {request_id: position for position, request_id in enumerate(ranked_ids)}
+        matches = query.all() + archived_by_ids(db, ranked_ids, service_filter, status_filter)
+        page = KeysetPage(sorted(matches, key=lambda r: rank[r.id]))
+    else:
+        # Fetch one keyset page ordered by newest first
+        page_size = get_page_size(request.args,
+                                  app.config['REQUESTS_PAGE_SIZE'],
+                                  app.config['REQUESTS_MAX_PAGE_SIZE'])
+        page = paginate_requests(query, ServiceRequest, page_size,
+                                 after=request.args.get('after'),
+                                 before=request.args.get('before'))
+
     return render_template('worker_requests.html',
-                         requests=requests,
+                         requests=page.items,
+                         page=page,
                          search_query=search_query,
                          service_filter=service_filter,
                          status_filter=status_filter)
 
+@app.route('/worker/requests/export')
+@login_required
+def export_requests():
+    """Stream the filtered request list as CSV or XLSX"""
+    if session.get('user_type') != 'worker':
+        flash('Please log in as a worker.', 'error')
+        return redirect(url_for('auth') + '?role=worker')
+    
+    from itertools import chain
+    from flask import abort, stream_with_context
+    from models import get_model, init_models
+    from search import apply_request_filters
+    from exports import (EXPORT_FORMATS, FETCH_ROWS, export_columns, export_filename,
+                         export_statement, iter_csv, iter_xlsx)
+    Student, _, ServiceRequest = init_models(db)
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        abort(400)
+    search_query = request.args.get('search', '').strip()
+    service_filter = request.args.get('service', '')
+    status_filter = request.args.get('status', '')
+    columns = export_columns(service_filter)
+    
+    def filtered(Model):
+        # Same filters as the request list, but every search match rather than the ranked window
+        statement, _ = apply_request_filters(db, export_statement(Student, Model, columns),
+                                             Student, Model, search_query, service_filter,
+                                             status_filter, limit=None)
+        return statement.execution_options(yield_per=FETCH_ROWS)
+    
+    def archived_rows():
+        yield from db.session.execute(filtered(get_model(db, 'ArchivedRequest')))
+    
+    # Run the query now so errors surface before the download starts
+    rows = db.session.execute(filtered(ServiceRequest))
+    if search_query:
+        # Searches cover archived requests too, as on the list; they follow the live rows
+        rows = chain(rows, archived_rows())
+    chunks = iter_csv(rows, columns) if export_format == 'csv' else iter_xlsx(rows, columns)
+    
+    return app.response_class(stream_with_context(chunks), mimetype=EXPORT_FORMATS[export_format], headers={
+        'Content-Disposition': f'attachment; filename="{export_filename(export_format)}"',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/worker/request/<int:request_id>')
 @login_required
 def worker_request_details(request_id):
@@ -822,14 +937,22 @@ def worker_request_details(request_id):
         return redirect(url_for('auth') + '?role=worker')
     
     from models import init_models
+    from archive import find_request
+    from sqlalchemy.orm import joinedload, load_only
     Student, _, ServiceRequest = init_models(db)
     
-    service_request = db.session.get(ServiceRequest, request_id)
+    # Request and student profile in one SELECT (archived requests are looked up after)
+    service_request = find_request(db, request_id, options=[
+        joinedload(ServiceRequest.student).load_only(
+            Student.full_name, Student.roll_number, Student.email, Student.year,
+            Student.division, Student.department, Student.phone_number
+        )
+    ])
     if service_request is None:
         from flask import abort
         abort(404)
 
-    student = db.session.get(Student, service_request.student_id)
+    student = service_request.student
     
     # Service type mapping
     service_names = {
@@ -869,6 +992,7 @@ def update_request_status(request_id):
         return redirect(url_for('auth') + '?role=worker')
     
     from models import init_models
+    from workflow import apply_status
     _, _, ServiceRequest = init_models(db)
     
     try:
@@ -881,16 +1005,10 @@ def update_request_status(request_id):
         new_status = request.form.get('status')
         worker_remarks = request.form.get('remarks', '').strip()
         
-        # Update status
         if new_status:
-            service_request.status = new_status
-            
-            # Update collected_at if status is Collected
-            if new_status == 'Collected':
-                service_request.collected_at = datetime.utcnow()
-        
-        # Update remarks
-        if worker_remarks:
+            # Stamps processed/ready/collected times and logs the transition
+            apply_status(db, ServiceRequest, [request_id], new_status, worker_remarks, current_user.id)
+        elif worker_remarks:
             service_request.remarks = worker_remarks
         
         db.session.commit()
@@ -904,6 +1022,185 @@ def update_request_status(request_id):
         flash('Error updating request. Please try again.', 'error')
         return redirect(url_for('worker_request_details', request_id=request_id))
 
+@app.route('/worker/requests/bulk-status', methods=['POST'])
+@login_required
+def bulk_update_status():
+    """Apply one status (and optional remarks) to many requests at once"""
+    if session.get('user_type') != 'worker':
+        flash('Please log in as a worker.', 'error')
+        return redirect(url_for('auth') + '?role=worker')
+    
+    from models import init_models
+    from workflow import apply_status, MAX_BULK_REQUESTS
+    _, _, ServiceRequest = init_models(db)
+    
+    wants_json = request.accept_mimetypes.best == 'application/json'
+    next_url = request.form.get('next', '')
+    if not next_url.startswith('/worker/requests'):
+        next_url = url_for('worker_requests')
+    
+    new_status = request.form.get('status', '')
+    worker_remarks = request.form.get('remarks', '').strip()
+    try:
+        request_ids = [int(value) for value in request.form.getlist('request_ids')]
+    except ValueError:
+        request_ids = None
+    
+    if not request_ids or len(request_ids) > MAX_BULK_REQUESTS:
+        message = f'Select between 1 and {MAX_BULK_REQUESTS} requests.'
+        if wants_json:
+            return jsonify({'error': message}), 400
+        flash(message, 'error')
+        return redirect(next_url)
+    
+    try:
+        results = apply_status(db, ServiceRequest, request_ids, new_status, worker_remarks, current_user.id)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        if wants_json:
+            return jsonify({'error': str(e)}), 400
+        flash('Please choose a valid status.', 'error')
+        return redirect(next_url)
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f'Error in bulk status update: {e}')
+        if wants_json:
+            return jsonify({'error': 'Bulk update failed'}), 500
+        flash('Error updating requests. Please try again.', 'error')
+        return redirect(next_url)
+    
+    if wants_json:
+        return jsonify({'status': new_status,
+                        'results': [{'id': request_id, 'result': result} for request_id, result in results.items()]})
+    
+    outcome = list(results.values())
+    summary = f"{outcome.count('updated')} request(s) marked {new_status}"
+    if outcome.count('unchanged'):
+        summary += f", {outcome.count('unchanged')} already {new_status}"
+    if outcome.count('not_found'):
+        summary += f", {outcome.count('not_found')} not found"
+    flash(summary + '.', 'success')
+    return redirect(next_url)
+
+@app.route('/worker/analytics')
+@login_required
+def worker_analytics():
+    """Turnaround percentiles per service for one month (reads only the daily rollups)"""
+    if session.get('user_type') != 'worker':
+        flash('Please log in as a worker.', 'error')
+        return redirect(url_for('auth') + '?role=worker')
+    
+    from models import TOKEN_PREFIXES
+    from analytics import month_range, turnaround_summary
+    
+    type_filter = request.args.get('type', '')
+    try:
+        first_day, last_day = month_range(request.args.get('month') or None)
+    except ValueError:
+        first_day, last_day = month_range()
+    
+    summary = turnaround_summary(db, first_day, last_day, request_type=type_filter or None)
+    return render_template('worker_analytics.html',
+                         summary=summary,
+                         first_day=first_day,
+                         month=first_day.strftime('%Y-%m'),
+                         type_filter=type_filter,
+                         request_types=list(TOKEN_PREFIXES))
+
+@app.route('/documents/<int:request_id>/<document>')
+@login_required
+def serve_document(request_id, document):
+    """Serve an uploaded document to its student or to office workers"""
+    from documents import send_document
+    from archive import find_request
+    
+    service_request = find_request(db, request_id)
+    if service_request is None:
+        from flask import abort
+        abort(404)
+    
+    # Students may only download their own documents
+    user_type = session.get('user_type')
+    if user_type == 'student' and service_request.student_id == current_user.id:
+        return send_document(service_request, document)
+    if user_type == 'worker':
+        return send_document(service_request, document)
+    
+    from flask import abort
+    abort(403)
+
+@app.route('/worker/diagnostics')
+@login_required
+def worker_diagnostics():
+    """Runtime diagnostics for administrators (JSON)"""
+    if session.get('user_type') != 'worker' or current_user.role != 'admin':
+        from flask import abort
+        abort(403)
+    
+    from passwords import latency_snapshot
+    return jsonify({
+        'boot_seconds': round(app.config.get('BOOT_SECONDS', 0), 4),
+        'password_hashing': latency_snapshot(),
+        'database_pool': pool_status(db.engine)
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics summed across all worker processes"""
+    import hmac
+    from flask import abort
+    token = app.config.get('METRICS_TOKEN')
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            abort(401)
+    elif request.remote_addr not in ('127.0.0.1', '::1') or 'X-Forwarded-For' in request.headers:
+        # Without a token only a scraper on this host (not behind the proxy) may read it
+        abort(403)
+    
+    from metrics import collect, render_prometheus
+    return app.response_class(render_prometheus(collect(app.config)),
+                              mimetype='text/plain; version=0.0.4')
+
+@app.route('/events/stream')
+@login_required
+def live_stream():
+    """Server-Sent Events: status changes for a student, new and updated requests for workers"""
+    from livefeed import WORKERS, stream, stream_limit, stream_slots, student_audience
+    
+    user_type = session.get('user_type')
+    audiences = [WORKERS] if user_type == 'worker' else [student_audience(current_user.id)]
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+    
+    if not stream_slots.acquire(stream_limit(app)):
+        # EventSource stops on a non-200 response; the page works without live updates
+        return app.response_class('Too many live streams\n', status=503,
+                                  headers={'Retry-After': '30'}, mimetype='text/plain')
+    
+    # The stream outlives the request's need for a database connection
+    db.session.close()
+    config = app.config
+    
+    def generate():
+        try:
+            yield from stream(audiences, last_event_id, config)
+        finally:
+            stream_slots.release()
+    
+    return app.response_class(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/assets/<path:filename>')
+def serve_asset(filename):
+    """Fingerprinted static files (immutable, precompressed)"""
+    from assets import send_asset
+    return send_asset(filename)
+
 # Will add more routes in subsequent phases
 
 # ==================== ERROR HANDLERS ====================
@@ -919,6 +1216,8 @@ def internal_error(error):
 
 # ==================== TEMPLATE FILTERS ====================
 
+app.add_template_global(asset_url)
+
 @app.template_filter('datetime')
 def format_datetime(value):
     """Format datetime for display"""
@@ -933,33 +1232,190 @@ def format_date(value):
         return ""
     return value.strftime('%d %b %Y')
 
+@app.template_filter('duration')
+def format_duration(seconds):
+    """Format a number of seconds as minutes, hours or days"""
+    if seconds is None:
+        return "-"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    if seconds < 48 * 3600:
+        return f"{seconds / 3600:.1f} h"
+    return f"{seconds / 86400:.1f} days"
+
+# ==================== CLI COMMANDS ====================
+
+uploads_cli = AppGroup('uploads', help='Manage uploaded documents.')
+
+@uploads_cli.command('sweep')
+@click.option('--grace-hours', default=24, show_default=True,
+              help='Only delete unreferenced files older than this.')
+@click.option('--max-files', default=2000, show_default=True,
+              help='Directory entries to examine in this run.')
+@click.option('--dry-run', is_flag=True, help='Report without deleting anything.')
+def sweep_uploads(grace_hours, max_files, dry_run):
+    """Delete upload files no request references (incremental)"""
+    from storage import sweep_orphans
+    summary = sweep_orphans(db, app.config['UPLOAD_FOLDER'],
+                            grace_seconds=grace_hours * 3600,
+                            max_files=max_files,
+                            dry_run=dry_run)
+    action = 'Would delete' if dry_run else 'Deleted'
+    click.echo(f">> Checked {summary['released']} released blobs, scanned {summary['scanned']} files")
+    click.echo(f">> {action} {summary['deleted']} orphans ({summary['reclaimed_bytes']} bytes)")
+    if summary['completed_pass']:
+        click.echo(">> Reached the end of uploads/ - next run starts from the beginning")
+
+app.cli.add_command(uploads_cli)
+
+data_cli = AppGroup('data', help='Bulk import and export of students and requests.')
+
+@data_cli.command('import-students')
+@click.argument('path')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+              help='Input format (default: from the file extension).')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per INSERT batch.')
+@click.option('--workers', type=int, help='Hashing processes (default: CPU count).')
+@click.option('--hash-method', help="Method for plain passwords, e.g. 'pbkdf2:sha256:1000' "
+                                    "for staging (upgraded on each user's next login).")
+@click.option('--default-password', help='Password for rows that carry none.')
+def import_students_command(path, fmt, batch_size, workers, hash_method, default_password):
+    """Load students from CSV or JSONL ('-' reads stdin)"""
+    from dataio import detect_format, import_students, open_text, read_rows
+    try:
+        fmt = detect_format(path, fmt)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='PATH')
+    started = time.perf_counter()
+    with open_text(path, 'r') as fh:
+        total = import_students(db, read_rows(fh, fmt), batch_size=batch_size, workers=workers,
+                                method=hash_method, default_password=default_password)
+    click.echo(f">> Imported {total} students in {time.perf_counter() - started:.1f}s")
+
+@data_cli.command('import-requests')
+@click.argument('path')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+              help='Input format (default: from the file extension).')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per INSERT batch.')
+def import_requests_command(path, fmt, batch_size):
+    """Load service requests from CSV or JSONL ('-' reads stdin)"""
+    from dataio import detect_format, import_requests, open_text, read_rows
+    try:
+        fmt = detect_format(path, fmt)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='PATH')
+    started = time.perf_counter()
+    with open_text(path, 'r') as fh:
+        total = import_requests(db, read_rows(fh, fmt), batch_size=batch_size)
+    click.echo(f">> Imported {total} requests in {time.perf_counter() - started:.1f}s")
+
+@data_cli.command('export')
+@click.argument('kind', type=click.Choice(['students', 'requests']))
+@click.option('--output', '-o', default='-', show_default=True, help="Output file ('-' for stdout).")
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+              help='Output format (default: from the file extension, else jsonl).')
+@click.option('--include-password-hash', is_flag=True,
+              help='Export student password hashes so a staging copy can log in.')
+def export_command(kind, output, fmt, include_password_hash):
+    """Stream students or requests to CSV or JSONL"""
+    from dataio import detect_format, export_rows, open_text, write_rows
+    try:
+        fmt = detect_format(output, fmt, default='jsonl')
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--output')
+    with open_text(output, 'w') as fh:
+        write_rows(export_rows(db, kind, include_password_hash=include_password_hash), fh, fmt)
+
+app.cli.add_command(data_cli)
+
+assets_cli = AppGroup('assets', help='Build fingerprinted static assets.')
+
+@assets_cli.command('build')
+def build_assets_command():
+    """Hash, precompress and write a manifest for everything under static/"""
+    from assets import build_assets, build_folder
+    output = build_folder(app)
+    click.echo(f">> Building assets into {output}")
+    manifest = build_assets(app.static_folder, output, echo=click.echo)
+    click.echo(f">> {len(manifest)} assets written")
+
+app.cli.add_command(assets_cli)
+
+analytics_cli = AppGroup('analytics', help='Turnaround analytics maintenance.')
+
+@analytics_cli.command('rebuild')
+def rebuild_analytics_command():
+    """Recompute the daily turnaround rollups from request timestamps"""
+    from analytics import rebuild_rollups
+    recorded = rebuild_rollups(db)
+    click.echo(f">> Rebuilt turnaround rollups from {recorded} durations")
+
+app.cli.add_command(analytics_cli)
+
+archive_cli = AppGroup('archive', help='Move finished requests out of the live table.')
+
+@archive_cli.command('run')
+@click.option('--days', type=int, default=None,
+              help='Archive requests finished more than this many days ago [default: ARCHIVE_AFTER_DAYS].')
+@click.option('--batch-size', default=1000, show_default=True, help='Requests moved per transaction.')
+@click.option('--dry-run', is_flag=True, help='Only count the requests that would be moved.')
+def archive_run_command(days, batch_size, dry_run):
+    """Move Collected/Rejected requests older than the cutoff to the archive"""
+    from archive import archive_requests
+    days = app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+    moved = archive_requests(db, days, batch_size=batch_size, dry_run=dry_run, echo=click.echo)
+    action = 'Would archive' if dry_run else 'Archived'
+    click.echo(f">> {action} {moved} requests finished more than {days} days ago")
+
+app.cli.add_command(archive_cli)
+
+@app.cli.command('bootstrap')
+def bootstrap_command():
+    """Create/upgrade the schema and seed the default admin (run once per deploy)"""
+    from bootstrap import bootstrap_database
+    bootstrap_database(db, echo=click.echo)
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Create missing tables, columns and indexes without seeding data"""
+    from bootstrap import migrate_database
+    migrate_database(db, echo=click.echo)
+
+# ==================== APP FACTORY ====================
+
+_bootstrapped = False
+
+@app.before_request
+def _auto_bootstrap():
+    """Development convenience: bootstrap lazily on the first request"""
+    global _bootstrapped
+    if not _bootstrapped and app.config.get('AUTO_BOOTSTRAP'):
+        from bootstrap import bootstrap_database
+        bootstrap_database(db, echo=app.logger.info)
+    _bootstrapped = True
+
+def create_app():
+    """Application factory entry point (gunicorn 'app:create_app()')
+
+    Importing this module performs no database I/O; models are initialized
+    lazily on first use and the schema is managed by `flask bootstrap`.
+    """
+    return app
+
+# Importing ends here - record how long worker boot took
+app.config['BOOT_SECONDS'] = time.perf_counter() - _BOOT_STARTED
+app.logger.info(f"App imported in {app.config['BOOT_SECONDS'] * 1000:.0f} ms")
+
 # ==================== RUN APPLICATION ====================
 
 if __name__ == '__main__':
     with app.app_context():
-        # Initialize models with db
-        from models import init_models
-        Student, Worker, ConcessionRequest = init_models(db)
-        
-        # Create all tables
-        db.create_all()
-        print(">> Database tables created successfully!")
-        
-        # Create default worker if not exists
-        if not Worker.query.filter_by(employee_id='ADMIN001').first():
-            admin_default_password = os.environ.get('ADMIN_DEFAULT_PASSWORD', 'admin123')
-            admin_worker = Worker(
-                employee_id='ADMIN001',
-                email='admin@college.edu',
-                full_name='System Administrator',
-                department='Administration',
-                role='admin',
-                is_active=True
-            )
-            admin_worker.set_password(admin_default_password)
-            db.session.add(admin_worker)
-            db.session.commit()
-            print(">> Default admin worker created (Employee ID: ADMIN001)")
+        from bootstrap import bootstrap_database
+        bootstrap_database(db)
+    
+    # The development server starts a thread per request, so streams cannot starve it
+    if app.config['LIVE_MAX_STREAMS'] is None:
+        app.config['LIVE_MAX_STREAMS'] = 8
     
     # Run the application
     print(">> Starting Railway Concession Management System...")
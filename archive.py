@@ -0,0 +1,103 @@
+"""
+Request Archive for StudentHub
+Finished requests (Collected or Rejected) older than ARCHIVE_AFTER_DAYS are
+moved, with their status history, from service_requests into
+archived_requests in short batched transactions, so the worker list, the
+dashboard and token allocation only ever touch the working set. Ids and
+tokens are kept, and student history, document downloads and search read
+both tables
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, delete, func, insert, literal, select
+from sqlalchemy.orm import joinedload
+from models import get_model
+
+# Statuses after which a request never changes again
+ARCHIVE_STATUSES = ('Collected', 'Rejected')
+
+
+def _finished_before(table, cutoff):
+    """Archivable rows of service_requests: finished, last touched before `cutoff`"""
+    finished_at = func.coalesce(table.c.collected_at, table.c.updated_at, table.c.submitted_at)
+    return table.c.status.in_(ARCHIVE_STATUSES) & (finished_at < cutoff)
+
+
+def archive_requests(db, older_than_days, batch_size=1000, dry_run=False, echo=print):
+    """Move finished requests older than `older_than_days` to the archive
+
+    Each batch is its own transaction, so live traffic is never blocked for
+    long and an interrupted run keeps the batches it finished. Returns the
+    number of requests moved (or that would be moved, with dry_run).
+    """
+    live = get_model(db, 'ServiceRequest').__table__
+    archived = get_model(db, 'ArchivedRequest').__table__
+    events = get_model(db, 'RequestStatusEvent').__table__
+    archived_events = get_model(db, 'ArchivedStatusEvent').__table__
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    # SQLite gives a new row max(id) + 1, so moving the newest request or the
+    # newest status event out would let its id be handed out again. Their
+    # request stays live until something newer exists.
+    newest_event_owner = select(events.c.request_id).where(
+        events.c.id == select(func.max(events.c.id)).scalar_subquery())
+    archivable = (
+        _finished_before(live, cutoff)
+        & (live.c.id < select(func.max(live.c.id)).scalar_subquery())
+        & live.c.id.not_in(newest_event_owner)
+    )
+
+    if dry_run:
+        return db.session.execute(select(func.count()).select_from(live).where(archivable)).scalar()
+
+    request_columns = [column.name for column in live.columns]
+    event_columns = [column.name for column in events.columns]
+    moved = 0
+    while True:
+        ids = db.session.execute(
+            select(live.c.id).where(archivable).order_by(live.c.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+
+        conn = db.session.connection()
+        now = datetime.utcnow()
+        conn.execute(insert(archived).from_select(
+            request_columns + ['archived_at'],
+            select(*[live.c[name] for name in request_columns], literal(now, DateTime))
+            .where(live.c.id.in_(ids))
+        ))
+        conn.execute(insert(archived_events).from_select(
+            event_columns,
+            select(*[events.c[name] for name in event_columns]).where(events.c.request_id.in_(ids))
+        ))
+        conn.execute(delete(events).where(events.c.request_id.in_(ids)))
+        conn.execute(delete(live).where(live.c.id.in_(ids)))
+        db.session.commit()
+
+        moved += len(ids)
+        echo(f'  archived {moved} requests (up to id {ids[-1]})')
+    return moved
+
+
+# ==================== READING ====================
+
+def find_request(db, request_id, options=()):
+    """A request by id from the live table, falling back to the archive"""
+    ServiceRequest = get_model(db, 'ServiceRequest')
+    service_request = db.session.get(ServiceRequest, request_id, options=list(options))
+    if service_request is None:
+        service_request = db.session.get(get_model(db, 'ArchivedRequest'), request_id)
+    return service_request
+
+
+def archived_by_ids(db, ids, service_filter='', status_filter=''):
+    """Archived requests among `ids` (a search window) matching the list filters"""
+    if not ids:
+        return []
+    ArchivedRequest = get_model(db, 'ArchivedRequest')
+    query = ArchivedRequest.query.options(joinedload(ArchivedRequest.student)).filter(ArchivedRequest.id.in_(ids))
+    if service_filter:
+        query = query.filter(ArchivedRequest.request_type == service_filter)
+    if status_filter:
+        query = query.filter(ArchivedRequest.status == status_filter)
+    return query.all()
@@ -0,0 +1,152 @@
+"""
+Static Asset Pipeline for StudentHub
+`flask assets build` copies every file under static/ to a content-hashed name,
+writes gzip (and brotli, when installed) variants next to it and records the
+mapping in a manifest. Templates link assets through asset_url(), and the
+hashed files are served with immutable far-future caching and the best
+precompressed encoding the client accepts
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import threading
+from flask import abort, current_app, request, url_for
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+
+# Text formats worth precompressing; images are already compressed
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map'}
+
+# A hashed name never changes content, so clients may keep it for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def build_folder(app):
+    return app.config.get('ASSET_BUILD_FOLDER') or os.path.join(app.static_folder, 'dist')
+
+
+def _hashed_name(relpath, digest):
+    stem, extension = os.path.splitext(relpath)
+    return f'{stem}.{digest[:12]}{extension}'
+
+
+def build_assets(static_folder, output_folder, echo=print):
+    """Fingerprint and precompress every static file; returns the manifest"""
+    if os.path.isdir(output_folder):
+        shutil.rmtree(output_folder)
+    manifest = {}
+    output_real = os.path.realpath(output_folder)
+
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if os.path.realpath(os.path.join(root, d)) != output_real)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            relpath = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as fh:
+                data = fh.read()
+
+            hashed = _hashed_name(relpath, hashlib.sha256(data).hexdigest())
+            target = os.path.join(output_folder, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as fh:
+                fh.write(data)
+
+            variants = []
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE:
+                # mtime=0 keeps the .gz byte-identical between builds
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(compressed) < len(data):
+                    with open(target + '.gz', 'wb') as fh:
+                        fh.write(compressed)
+                    variants.append(f'gz {len(compressed)}')
+                if brotli is not None:
+                    compressed = brotli.compress(data, quality=11)
+                    if len(compressed) < len(data):
+                        with open(target + '.br', 'wb') as fh:
+                            fh.write(compressed)
+                        variants.append(f'br {len(compressed)}')
+
+            manifest[relpath] = hashed
+            echo(f'  {relpath} -> {hashed} ({len(data)} bytes{", " if variants else ""}{", ".join(variants)})')
+
+    with open(os.path.join(output_folder, MANIFEST_NAME), 'w') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    reset_manifest()
+    return manifest
+
+
+def reset_manifest():
+    """Forget the loaded manifest so the next lookup re-reads it"""
+    global _manifest
+    with _manifest_lock:
+        _manifest = None
+
+
+def _load_manifest():
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            path = os.path.join(build_folder(current_app), MANIFEST_NAME)
+            try:
+                with open(path) as fh:
+                    _manifest = json.load(fh)
+            except (OSError, ValueError):
+                # No build (development) - plain static URLs
+                _manifest = {}
+        return _manifest
+
+
+def asset_url(filename):
+    """url_for('static', filename=...) replacement that resolves fingerprinted names"""
+    hashed = _load_manifest().get(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('serve_asset', filename=hashed)
+
+
+def send_asset(filename):
+    """Serve a fingerprinted file, precompressed when the client accepts it"""
+    folder = build_folder(current_app)
+    path = safe_join(folder, filename)
+    if path is None or filename == MANIFEST_NAME or not os.path.isfile(path):
+        abort(404)
+
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if candidate in request.accept_encodings and os.path.isfile(path + suffix):
+            encoding, path = candidate, path + suffix
+            break
+
+    response = send_file(
+        path,
+        request.environ,
+        mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        conditional=True,
+        max_age=IMMUTABLE_MAX_AGE,
+        response_class=current_app.response_class
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.cache_control.no_cache = None
+    return response
+
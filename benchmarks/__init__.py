@@ -0,0 +1,9 @@
+"""
+StudentHub Benchmark Suite
+Seeds a throwaway database and drives the hot routes through Flask's test
+client, reporting latency percentiles, throughput and SQL queries per request
+
+    python -m benchmarks --students 500 --requests 20000 --output bench.json
+    python -m benchmarks --baseline bench.json      # fail on regressions
+    python -m benchmarks.budget                     # per-route SQL statement budgets
+"""
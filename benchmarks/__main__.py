@@ -0,0 +1,84 @@
+"""
+Command line entry point: python -m benchmarks [options]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__)
+    parser.add_argument('--students', type=int, default=200, help='students to seed')
+    parser.add_argument('--requests', type=int, default=5000, help='service requests to seed')
+    parser.add_argument('--iterations', type=int, default=50, help='requests per scenario')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for the dataset')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--baseline', help='compare against an earlier JSON report')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed p95 slowdown vs the baseline (0.25 = 25%%)')
+    return parser.parse_args(argv)
+
+
+def compare(results, baseline, tolerance):
+    """Regression messages for scenarios slower or chattier than the baseline"""
+    previous = {item['scenario']: item for item in baseline.get('results', [])}
+    problems = []
+    for item in results:
+        old = previous.get(item['scenario'])
+        if old is None:
+            continue
+        if old['p95_ms'] and item['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+            problems.append(f"{item['scenario']}: p95 {old['p95_ms']} -> {item['p95_ms']} ms")
+        if item['queries_per_request'] > old['queries_per_request']:
+            problems.append(f"{item['scenario']}: queries/request "
+                            f"{old['queries_per_request']} -> {item['queries_per_request']}")
+    return problems
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    from benchmarks.seed import scratch_app, seed_dataset, BENCH_PASSWORD
+    from benchmarks.runner import run_scenarios
+
+    app, db, admin_password = scratch_app()
+    with app.app_context():
+        started = time.perf_counter()
+        roll_numbers = seed_dataset(db, args.students, args.requests, seed=args.seed)
+        seed_seconds = time.perf_counter() - started
+        results = run_scenarios(app, db, roll_numbers, BENCH_PASSWORD, admin_password,
+                                iterations=args.iterations, seed=args.seed)
+        dialect = db.engine.dialect.name
+
+    report = {
+        'dataset': {'students': args.students, 'requests': args.requests, 'seed': args.seed},
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': dialect,
+            'password_hash_method': app.config.get('PASSWORD_HASH_METHOD')
+        },
+        'seed_seconds': round(seed_seconds, 3),
+        'results': results
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output + '\n')
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            problems = compare(results, json.load(fh), args.tolerance)
+        for problem in problems:
+            print(f'REGRESSION {problem}', file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
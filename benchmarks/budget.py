@@ -0,0 +1,267 @@
+"""
+Query budgets - every route is rendered against a seeded database and the SQL
+statements it issues are checked against benchmarks/query_budgets.json, so an
+N+1 introduced by a template or view change fails fast
+
+    python -m benchmarks.budget              # exit 1 when a route is over budget
+    python -m benchmarks.budget --update     # rewrite the file with current counts
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+from collections import namedtuple
+from contextlib import contextmanager
+
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_budgets.json')
+
+# Enough rows that a per-row lazy load shows up as dozens of extra statements
+BUDGET_STUDENTS = 30
+BUDGET_REQUESTS = 300
+
+# `path` and `data` are formatted with the runner's context
+# (request_id, roll_number, student_password, admin_password, asset)
+RouteCase = namedtuple('RouteCase', 'name role method path data warm')
+
+
+def _case(name, role, path, method='GET', data=None, warm=None):
+    return RouteCase(name, role, method, path, data or {}, method == 'GET' if warm is None else warm)
+
+
+ROUTE_CASES = (
+    _case('index', 'anonymous', '/'),
+    _case('auth', 'anonymous', '/auth'),
+    _case('student_register', 'anonymous', '/student/register', 'POST', {
+        'full_name': 'Budget Student', 'roll_number': 'BUDGET001', 'email': 'budget@bench.edu',
+        'department': 'IT', 'year': 'SE', 'division': 'A', 'phone_number': '9000000000',
+        'password': 'budget-pass', 'confirm_password': 'budget-pass'}),
+    _case('student_login', 'anonymous', '/student/login', 'POST',
+          {'login_id': '{roll_number}', 'password': '{student_password}'}),
+    _case('worker_register', 'anonymous', '/worker/register', 'POST', {
+        'full_name': 'Budget Worker', 'employee_id': 'BUDGETW01', 'email': 'budget-worker@bench.edu',
+        'department': 'Office', 'phone_number': '9000000001',
+        'password': 'budget-pass', 'confirm_password': 'budget-pass'}),
+    _case('worker_login', 'anonymous', '/worker/login', 'POST',
+          {'login_id': 'ADMIN001', 'password': '{admin_password}'}),
+    _case('metrics', 'anonymous', '/metrics'),
+    _case('serve_asset', 'anonymous', '/assets/{asset}'),
+    _case('student_dashboard', 'student', '/student/dashboard'),
+    _case('my_requests', 'student', '/student/my-requests'),
+    _case('academic_calendar', 'student', '/student/calendar'),
+    _case('faculty_details', 'student', '/student/faculty'),
+    _case('apply_service', 'student', '/student/apply/railway'),
+    _case('submit_application', 'student', '/student/submit/bonafide', 'POST',
+          {'purpose': 'Budget check', 'id_proof': b'%PDF-1.4 budget'}),
+    _case('fee_receipts', 'student', '/student/fee-receipts'),
+    _case('request_details', 'student', '/student/request/{request_id}'),
+    _case('serve_document', 'student', '/documents/{request_id}/id_proof'),
+    _case('student_profile', 'student', '/student/profile'),
+    _case('update_student_profile', 'student', '/student/profile/update', 'POST',
+          {'full_name': 'Bench Student 0', 'phone_number': '9000000002'}),
+    _case('student_change_password', 'student', '/student/change-password', 'POST',
+          {'old_password': '{student_password}', 'new_password': '{student_password}',
+           'confirm_password': '{student_password}'}),
+    _case('worker_dashboard', 'worker', '/worker/dashboard'),
+    _case('worker_requests', 'worker', '/worker/requests'),
+    _case('worker_requests_filtered', 'worker', '/worker/requests?status=Submitted&service=railway'),
+    _case('worker_requests_search', 'worker', '/worker/requests?search=bench'),
+    _case('export_requests', 'worker', '/worker/requests/export?service=railway'),
+    _case('export_requests_xlsx', 'worker', '/worker/requests/export?format=xlsx&search=bench'),
+    _case('worker_request_details', 'worker', '/worker/request/{request_id}'),
+    _case('update_request_status', 'worker', '/worker/update-status/{request_id}', 'POST',
+          {'status': 'In Progress', 'remarks': 'Budget check'}),
+    _case('bulk_update_status', 'worker', '/worker/requests/bulk-status', 'POST',
+          {'request_ids': '{request_id}', 'status': 'Ready', 'remarks': 'Budget check'}),
+    _case('worker_analytics', 'worker', '/worker/analytics'),
+    _case('live_stream', 'worker', '/events/stream'),
+    _case('worker_profile', 'worker', '/worker/profile'),
+    _case('update_worker_profile', 'worker', '/worker/profile/update', 'POST',
+          {'full_name': 'System Administrator', 'phone_number': '9000000003'}),
+    _case('worker_change_password', 'worker', '/worker/change-password', 'POST',
+          {'old_password': '{admin_password}', 'new_password': '{admin_password}',
+           'confirm_password': '{admin_password}'}),
+    _case('worker_diagnostics', 'worker', '/worker/diagnostics'),
+    _case('logout', 'student', '/logout', warm=False),
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A block issued more SQL statements than its budget allows"""
+
+
+class StatementLog:
+    """Records the SQL statements executed on an engine while active"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.statements = []
+        self.active = False
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active:
+            self.statements.append(statement)
+
+    @contextmanager
+    def capture(self):
+        """Collect the statements issued inside the block (yields the list)"""
+        self.statements = []
+        self.active = True
+        try:
+            yield self.statements
+        finally:
+            self.active = False
+
+
+@contextmanager
+def query_budget(log, name, budget):
+    """Fail with QueryBudgetExceeded when the block issues more than `budget` statements"""
+    with log.capture() as statements:
+        yield statements
+    if len(statements) > budget:
+        listing = '\n'.join(f'  {index + 1}. {" ".join(sql.split())[:200]}'
+                            for index, sql in enumerate(statements))
+        raise QueryBudgetExceeded(f'{name}: {len(statements)} SQL statements, budget {budget}\n{listing}')
+
+
+def load_budgets(path=BUDGET_FILE):
+    with open(path) as fh:
+        return json.load(fh)['budgets']
+
+
+def _format(value, context):
+    return value.format(**context) if isinstance(value, str) else value
+
+
+class BudgetRunner:
+    """Seeded app plus one logged-in client per role"""
+
+    def __init__(self, app, db, admin_password):
+        from benchmarks.seed import seed_dataset, BENCH_PASSWORD
+        self.app = app
+        self.db = db
+        with app.app_context():
+            self.log = StatementLog(db.engine)
+            roll_numbers = seed_dataset(db, BUDGET_STUDENTS, BUDGET_REQUESTS)
+        self.context = {'roll_number': roll_numbers[0], 'student_password': BENCH_PASSWORD,
+                        'admin_password': admin_password}
+        with app.test_request_context():
+            from assets import asset_url
+            self.context['asset'] = asset_url('css/style.css').split('/assets/', 1)[1]
+
+        self.clients = {'anonymous': app.test_client(), 'student': app.test_client(),
+                        'worker': app.test_client()}
+        self.clients['student'].post('/student/login', data={'login_id': roll_numbers[0],
+                                                             'password': BENCH_PASSWORD})
+        self.clients['worker'].post('/worker/login', data={'login_id': 'ADMIN001',
+                                                           'password': admin_password})
+
+        # A request of the logged-in student with a stored document
+        self.send(_case('setup', 'student', '/student/submit/railway', 'POST', {
+            'purpose': 'Budget setup', 'from_station': 'Dadar', 'to_station': 'Thane',
+            'id_proof': b'%PDF-1.4 budget setup'}))
+        with app.app_context():
+            from models import init_models
+            Student, _, ServiceRequest = init_models(db)
+            self.context['request_id'] = db.session.execute(
+                db.select(ServiceRequest.id).join(Student)
+                .where(Student.roll_number == roll_numbers[0])
+                .order_by(ServiceRequest.id.desc()).limit(1)
+            ).scalar_one()
+
+    def send(self, case):
+        client = self.clients[case.role]
+        path = _format(case.path, self.context)
+        if case.method == 'GET':
+            return client.get(path)
+        data = {}
+        for key, value in case.data.items():
+            # bytes values are sent as uploaded files
+            data[key] = (io.BytesIO(value), f'{key}.pdf') if isinstance(value, bytes) else _format(value, self.context)
+        return client.post(path, data=data, content_type='multipart/form-data')
+
+    def _errors(self, case, response):
+        """Error status or error flash of a response (pending flashes are cleared)"""
+        with self.clients[case.role].session_transaction() as session:
+            flashes = session.pop('_flashes', [])
+        errors = [message for category, message in flashes if category == 'error']
+        if response.status_code >= 400:
+            errors.append(f'HTTP {response.status_code}')
+        return errors
+
+    def count(self, case):
+        """Statements issued by one request of `case` (after a warm-up for GETs)"""
+        if case.warm:
+            self.send(case)
+        with self.log.capture() as statements:
+            response = self.send(case)
+        errors = self._errors(case, response)
+        if errors:
+            raise RuntimeError(f'{case.name} failed: {"; ".join(errors)}')
+        return len(statements)
+
+    def check(self, case, budget):
+        """Run `case` under its budget, raising QueryBudgetExceeded when over"""
+        if case.warm:
+            self.send(case)
+        with query_budget(self.log, case.name, budget):
+            response = self.send(case)
+        errors = self._errors(case, response)
+        if errors:
+            raise RuntimeError(f'{case.name} failed: {"; ".join(errors)}')
+
+
+def uncovered_endpoints(app, cases=ROUTE_CASES):
+    """Endpoints of app.url_map that no case exercises"""
+    adapter = app.url_map.bind('localhost')
+    covered = set()
+    for case in cases:
+        path = _format(case.path, {'request_id': 1, 'roll_number': '', 'student_password': '',
+                                   'admin_password': '', 'asset': 'x'}).split('?')[0]
+        covered.add(adapter.match(path, method=case.method)[0])
+    return sorted({rule.endpoint for rule in app.url_map.iter_rules()} - covered - {'static'})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.budget', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budgets', default=BUDGET_FILE, help='budget file to check against')
+    parser.add_argument('--update', action='store_true', help='write the measured counts as the budgets')
+    args = parser.parse_args(argv)
+
+    from benchmarks.seed import scratch_app
+    app, db, admin_password = scratch_app(prefix='studenthub-budget-')
+    runner = BudgetRunner(app, db, admin_password)
+    counts = {case.name: runner.count(case) for case in ROUTE_CASES}
+
+    if args.update:
+        with open(args.budgets, 'w') as fh:
+            json.dump({'dataset': {'students': BUDGET_STUDENTS, 'requests': BUDGET_REQUESTS},
+                       'budgets': counts}, fh, indent=2)
+            fh.write('\n')
+        print(f'Wrote {len(counts)} budgets to {args.budgets}')
+        return 0
+
+    budgets = load_budgets(args.budgets)
+    failures = 0
+    for endpoint in uncovered_endpoints(app):
+        print(f'{endpoint:28}    - /    -  NO CASE')
+        failures += 1
+    for name, count in counts.items():
+        budget = budgets.get(name)
+        if budget is None:
+            status = 'NO BUDGET'
+            failures += 1
+        elif count > budget:
+            status = 'OVER'
+            failures += 1
+        else:
+            status = 'ok'
+        print(f'{name:28} {count:4} / {budget if budget is not None else "-":>4}  {status}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
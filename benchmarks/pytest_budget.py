@@ -0,0 +1,48 @@
+"""
+pytest plugin for query budgets - registered in pytest.ini (`-p benchmarks.pytest_budget`)
+
+    def test_route_budgets(route_case, budget_runner, route_budgets):
+        budget_runner.check(route_case, route_budgets[route_case.name])
+
+    def test_requests_page(budget_runner, query_budget):
+        with query_budget('worker_requests', 2):
+            budget_runner.clients['worker'].get('/worker/requests')
+
+`route_case` is parametrized over every entry of ROUTE_CASES. The app is
+imported against a scratch database, so nothing else in the session may
+import it first.
+"""
+
+import pytest
+from benchmarks.budget import ROUTE_CASES, BUDGET_FILE, BudgetRunner, load_budgets, query_budget as _query_budget
+
+
+def pytest_addoption(parser):
+    parser.addoption('--query-budgets', default=BUDGET_FILE,
+                     help='JSON file of per-route SQL statement budgets')
+
+
+def pytest_generate_tests(metafunc):
+    if 'route_case' in metafunc.fixturenames:
+        metafunc.parametrize('route_case', ROUTE_CASES, ids=[case.name for case in ROUTE_CASES])
+
+
+@pytest.fixture(scope='session')
+def budget_runner():
+    """Seeded scratch app with logged-in anonymous/student/worker clients"""
+    from benchmarks.seed import scratch_app
+    app, db, admin_password = scratch_app(prefix='studenthub-budget-')
+    return BudgetRunner(app, db, admin_password)
+
+
+@pytest.fixture(scope='session')
+def route_budgets(request):
+    return load_budgets(request.config.getoption('--query-budgets'))
+
+
+@pytest.fixture
+def query_budget(budget_runner):
+    """Context manager factory: query_budget(name, budget) fails the test when exceeded"""
+    def factory(name, budget):
+        return _query_budget(budget_runner.log, name, budget)
+    return factory
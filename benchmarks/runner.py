@@ -0,0 +1,130 @@
+"""
+Benchmark scenarios - each flow is timed per request with SQL statements
+counted through a before_cursor_execute hook
+"""
+
+import io
+import math
+import random
+import time
+from sqlalchemy import event
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not samples:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(samples)) - 1)
+    return samples[index]
+
+
+class QueryCounter:
+    """Counts SQL statements executed on an engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def failed(response):
+    """Errors, and redirects the app uses to report a failure via flash()"""
+    if response.status_code >= 400:
+        return True
+    location = response.headers.get('Location', '')
+    return '/auth' in location or '/student/apply/' in location
+
+
+def measure(name, client, counter, make_request, iterations):
+    """Run one scenario and return its summary"""
+    latencies = []
+    queries = 0
+    errors = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        before = counter.count
+        request_started = time.perf_counter()
+        response = make_request(client, i)
+        latencies.append(time.perf_counter() - request_started)
+        queries += counter.count - before
+        if failed(response):
+            errors += 1
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'scenario': name,
+        'iterations': iterations,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'throughput_rps': round(iterations / elapsed, 2) if elapsed else 0.0,
+        'queries_per_request': round(queries / iterations, 2) if iterations else 0.0
+    }
+
+
+def login_student(client, roll_number, password):
+    return client.post('/student/login', data={'login_id': roll_number, 'password': password})
+
+
+def login_worker(client, password):
+    return client.post('/worker/login', data={'login_id': 'ADMIN001', 'password': password})
+
+
+def run_scenarios(app, db, roll_numbers, student_password, admin_password, iterations=50, seed=42):
+    """Run every scenario and return the list of summaries"""
+    from models import TOKEN_PREFIXES
+    rng = random.Random(seed)
+    counter = QueryCounter(db.engine)
+    results = []
+
+    anonymous = app.test_client()
+    results.append(measure(
+        'student_login', anonymous, counter,
+        lambda client, i: login_student(client, roll_numbers[i % len(roll_numbers)], student_password),
+        iterations
+    ))
+
+    student = app.test_client()
+    login_student(student, roll_numbers[0], student_password)
+    request_types = list(TOKEN_PREFIXES)
+
+    def submit(client, i):
+        request_type = request_types[i % len(request_types)]
+        data = {
+            'purpose': 'Benchmark',
+            'from_station': 'Dadar',
+            'to_station': 'Thane',
+            'id_proof': (io.BytesIO(b'%PDF-1.4 bench ' + str(rng.random()).encode()), 'id.pdf'),
+            'photo': (io.BytesIO(b'\x89PNG bench photo' * 64), 'photo.png')
+        }
+        return client.post(f'/student/submit/{request_type}', data=data,
+                           content_type='multipart/form-data')
+
+    results.append(measure('submit_application', student, counter, submit, iterations))
+    results.append(measure('my_requests', student, counter,
+                           lambda client, i: client.get('/student/my-requests'), iterations))
+
+    worker = app.test_client()
+    results.append(measure('worker_login', anonymous, counter,
+                           lambda client, i: login_worker(client, admin_password), min(iterations, 10)))
+    login_worker(worker, admin_password)
+
+    results.append(measure('worker_dashboard', worker, counter,
+                           lambda client, i: client.get('/worker/dashboard'), iterations))
+    filters = ('', '?status=Submitted', '?service=railway', '?service=exam&status=Ready',
+               '?search=bench+student+1', '?search=thane')
+    results.append(measure('worker_requests', worker, counter,
+                           lambda client, i: client.get('/worker/requests' + filters[i % len(filters)]),
+                           iterations))
+
+    statuses = ('In Progress', 'Ready', 'Collected')
+    results.append(measure(
+        'update_request_status', worker, counter,
+        lambda client, i: client.post(f'/worker/update-status/{i + 1}',
+                                      data={'status': statuses[i % len(statuses)]}),
+        iterations
+    ))
+    return results
@@ -0,0 +1,59 @@
+"""
+Database Bootstrap for StudentHub
+Schema creation, upgrades, search index build and admin seeding run from the
+`flask bootstrap` / `flask migrate` commands (or `python app.py`) instead of at
+import time, so gunicorn workers boot without touching the database
+"""
+
+import os
+import time
+from sqlalchemy.exc import IntegrityError
+from models import init_models, upgrade_schema
+
+
+def migrate_database(db, echo=print):
+    """Create missing tables, columns and indexes and build the search index"""
+    from search import create_search_index, rebuild_search_index
+
+    init_models(db)
+    db.create_all()
+    upgrade_schema(db)
+    echo(">> Database tables created successfully!")
+
+    if create_search_index(db):
+        echo(f">> Search index built ({rebuild_search_index(db)} requests)")
+
+
+def seed_admin(db, echo=print):
+    """Create the default ADMIN001 worker if it does not exist yet"""
+    _, Worker, _ = init_models(db)
+    if Worker.query.filter_by(employee_id='ADMIN001').first():
+        return
+
+    admin_default_password = os.environ.get('ADMIN_DEFAULT_PASSWORD', 'admin123')
+    admin_worker = Worker(
+        employee_id='ADMIN001',
+        email='admin@college.edu',
+        full_name='System Administrator',
+        department='Administration',
+        role='admin',
+        is_active=True
+    )
+    admin_worker.set_password(admin_default_password)
+    db.session.add(admin_worker)
+    try:
+        db.session.commit()
+        echo(">> Default admin worker created (Employee ID: ADMIN001)")
+    except IntegrityError:
+        # Another process seeded it first
+        db.session.rollback()
+
+
+def bootstrap_database(db, echo=print):
+    """Run every bootstrap step; returns the elapsed seconds"""
+    started = time.perf_counter()
+    migrate_database(db, echo)
+    seed_admin(db, echo)
+    elapsed = time.perf_counter() - started
+    echo(f">> Bootstrap finished in {elapsed * 1000:.0f} ms")
+    return elapsed
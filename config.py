@@ -3,7 +3,9 @@ Configuration Settings for StudentHub
 """
 
 import os
+import tempfile
 from datetime import timedelta
+from engine_profile import engine_options
 
 # Determine environment
 _IS_PRODUCTION = os.environ.get('FLASK_ENV', 'development').lower() == 'production'
@@ -22,9 +24,18 @@ class Config:
     SQLALCHEMY_DATABASE_URI = _db_url or \
         'sqlite:///' + os.path.join(os.path.dirname(os.path.abspath(__file__)), 'studenthub.db')
 
+    # Production runs `flask bootstrap` once per deploy; dev bootstraps on first request
+    AUTO_BOOTSTRAP = os.environ.get('AUTO_BOOTSTRAP', str(not _IS_PRODUCTION)).lower() in ('1', 'true', 'yes')
+
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
 
+    # Engine profile - SQLite pragmas / PostgreSQL pool sized from WEB_CONCURRENCY and GUNICORN_THREADS
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_KIB = 20000
+
     # Session Configuration - keep users logged in for 7 days
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
     SESSION_COOKIE_SECURE = _IS_PRODUCTION   # True in production (HTTPS only)
@@ -34,14 +45,71 @@ class Config:
     REMEMBER_COOKIE_HTTPONLY = True
     REMEMBER_COOKIE_SECURE = _IS_PRODUCTION    # True in production (HTTPS only)
 
+    # Password Hashing - scrypt, pbkdf2 or bcrypt; outdated hashes upgrade on login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', 32768))
+    PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 600000))
+    PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # per process
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))    # waiting beyond that are refused
+    PASSWORD_HASH_TIMEOUT = 10  # seconds
+
+    # Per-process cache of logged-in users (see identity.py)
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 300))  # seconds
+    IDENTITY_CACHE_SIZE = 10000
+
     # File Upload Configuration
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'pdf', 'jpg', 'jpeg', 'png'}
 
+    # Document serving - DOCUMENT_SENDFILE may be '', 'x-accel' (nginx) or 'x-sendfile'
+    DOCUMENT_SENDFILE = os.environ.get('DOCUMENT_SENDFILE', '')
+    DOCUMENT_ACCEL_PREFIX = os.environ.get('DOCUMENT_ACCEL_PREFIX', '/protected-uploads/')
+    DOCUMENT_CACHE_MAX_AGE = 3600
+
+    # Pagination (keyset pages on request lists)
+    REQUESTS_PAGE_SIZE = int(os.environ.get('REQUESTS_PAGE_SIZE', 50))
+    REQUESTS_MAX_PAGE_SIZE = 200
+
+    # Worker search returns at most this many ranked matches
+    SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 100))
+
+    # Token numbers - values above 1 reserve blocks of tokens per worker process
+    TOKEN_BLOCK_SIZE = int(os.environ.get('TOKEN_BLOCK_SIZE', 1))
+
     # Daily Concession Limit
-    DAILY_CONCESSION_LIMIT = 50
+    DAILY_CONCESSION_LIMIT = int(os.environ.get('DAILY_CONCESSION_LIMIT', 50))
+    
+    # Submissions accepted per day and request type (types not listed are unlimited)
+    DAILY_REQUEST_LIMITS = {'railway': DAILY_CONCESSION_LIMIT}
+
+    # Fingerprinted assets written by `flask assets build` (default: static/dist)
+    ASSET_BUILD_FOLDER = os.environ.get('ASSET_BUILD_FOLDER', '')
+
+    # Rendered page cache for template-only pages, keyed on the values they show (0 disables)
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 300))  # seconds
+    PAGE_CACHE_SIZE = 5000
 
+    # Metrics (/metrics aggregates the per-worker files in METRICS_DIR)
+    METRICS_DIR = os.environ.get('METRICS_DIR') or os.path.join(tempfile.gettempdir(), 'studenthub-metrics')
+    METRICS_FLUSH_INTERVAL = 1.0  # seconds
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')  # Bearer token; unset = loopback only
+    
+    # Live updates (/events/stream); the journal is shared by the workers on one host
+    LIVE_EVENTS_DB = os.environ.get('LIVE_EVENTS_DB') or os.path.join(tempfile.gettempdir(), 'studenthub-live.db')
+    LIVE_EVENTS_RETENTION = 3600  # seconds a reconnecting client can resume from
+    LIVE_POLL_INTERVAL = 0.5  # seconds between checks for other workers' events
+    LIVE_HEARTBEAT_SECONDS = 15
+    LIVE_STREAM_MAX_SECONDS = int(os.environ.get('LIVE_STREAM_MAX_SECONDS', 300))  # client reconnects after
+    # Each open stream holds a request thread. Unset: half of a worker's threads (at least one),
+    # and none for single-threaded workers, which is logged; 0 turns live updates off
+    LIVE_MAX_STREAMS = int(os.environ['LIVE_MAX_STREAMS']) if os.environ.get('LIVE_MAX_STREAMS') else None
+    LIVE_RETRY_MS = 3000
+    
+    # Finished requests older than this move to archived_requests (`flask archive run`)
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+    
     # Application Settings
     APP_NAME = 'StudentHub'
     COLLEGE_NAME = 'Your College Name'
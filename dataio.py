@@ -0,0 +1,250 @@
+"""
+Bulk Import/Export for StudentHub
+Students and service requests are loaded from CSV or JSONL (one JSON object
+per line) with batched Core executemany inserts, passwords are hashed in a
+process pool, and exports stream rows from a server-side cursor
+"""
+
+import csv
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import select
+from models import get_model, init_models
+from passwords import hash_with_method, method_string
+from search import reindex_requests
+from tokens import advance_sequence, format_token, parse_token, reserve_sequence
+
+STUDENT_FIELDS = ('roll_number', 'email', 'full_name', 'department', 'year', 'division',
+                  'phone_number', 'created_at')
+
+REQUEST_FIELDS = ('token_number', 'request_type', 'roll_number', 'status', 'from_station',
+                  'to_station', 'journey_class', 'duration', 'purpose', 'address', 'remarks',
+                  'submitted_at', 'processed_at', 'ready_at', 'collected_at')
+
+_DATETIME_FIELDS = ('created_at', 'submitted_at', 'processed_at', 'ready_at', 'collected_at')
+
+
+# ==================== READING ====================
+
+def detect_format(path, fmt=None, default='csv'):
+    """'csv' or 'jsonl', from the explicit option or the file extension
+
+    JSON is read and written as JSON Lines (one object per line, the format
+    `flask data export` produces). A plain .json file usually holds an array,
+    which is not streamable, so it is refused rather than misread.
+    """
+    if fmt:
+        return fmt
+    if path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith('.json'):
+        raise ValueError(f"{path}: JSON arrays are not supported - use JSON Lines (.jsonl), "
+                         "or pass --format jsonl if the file has one object per line")
+    return default
+
+
+def read_rows(fh, fmt):
+    """Yield dicts from an open CSV or JSONL file without loading it whole"""
+    if fmt == 'csv':
+        for row in csv.DictReader(fh):
+            yield {key: (value if value != '' else None) for key, value in row.items()}
+    else:
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def batched(rows, size):
+    """Split an iterator into lists of at most `size` items"""
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _parse_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+# ==================== IMPORT ====================
+
+def import_students(db, rows, batch_size=5000, workers=None, method=None, default_password=None):
+    """Insert students in batches; returns the number inserted
+
+    Rows carry either `password_hash` (used as is) or `password`, which is
+    hashed in a process pool with `method` (default: the configured one).
+    """
+    Student, _, _ = init_models(db)
+    table = Student.__table__
+    method = method or method_string()
+    now = datetime.utcnow()
+    shared_hash = hash_with_method(default_password, method) if default_password else None
+    total = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in batched(rows, batch_size):
+            to_hash = [row.get('password') for row in batch if not row.get('password_hash') and row.get('password')]
+            hashes = iter(pool.map(hash_with_method, to_hash, [method] * len(to_hash),
+                                   chunksize=max(1, len(to_hash) // 64)))
+            records = []
+            for row in batch:
+                if row.get('password_hash'):
+                    password_hash = row['password_hash']
+                elif row.get('password'):
+                    password_hash = next(hashes)
+                elif shared_hash:
+                    password_hash = shared_hash
+                else:
+                    raise ValueError(f"No password for student {row.get('roll_number')}")
+                record = {field: row.get(field) for field in STUDENT_FIELDS}
+                record['roll_number'] = record['roll_number'].upper()
+                record['email'] = record['email'].lower()
+                record['password_hash'] = password_hash
+                record['created_at'] = _parse_datetime(record['created_at']) or now
+                record['updated_at'] = now
+                record['auth_version'] = 1
+                records.append(record)
+            db.session.execute(table.insert(), records)
+            db.session.commit()
+            total += len(records)
+    return total
+
+
+def import_requests(db, rows, batch_size=5000):
+    """Insert service requests in batches; returns the number inserted
+
+    Rows reference their student by `roll_number` (or `student_id`). Rows
+    without a `token_number` get one reserved in bulk from the counters, and
+    the counters are moved past any tokens the rows bring with them.
+    """
+    Student, _, ServiceRequest = init_models(db)
+    table = ServiceRequest.__table__
+    now = datetime.utcnow()
+    total = 0
+
+    for batch in batched(rows, batch_size):
+        conn = db.session.connection()
+
+        # Resolve roll numbers with one query per batch
+        rolls = {row['roll_number'].upper() for row in batch if row.get('roll_number')}
+        student_ids = dict(conn.execute(
+            select(Student.roll_number, Student.id).where(Student.roll_number.in_(rolls))
+        ).all()) if rolls else {}
+
+        records = []
+        for row in batch:
+            record = {field: row.get(field) for field in REQUEST_FIELDS if field != 'roll_number'}
+            for field in _DATETIME_FIELDS:
+                if field in record:
+                    record[field] = _parse_datetime(record[field])
+            record['submitted_at'] = record['submitted_at'] or now
+            record['updated_at'] = now
+            record['status'] = record['status'] or 'Submitted'
+            if row.get('student_id'):
+                record['student_id'] = int(row['student_id'])
+            else:
+                record['student_id'] = student_ids.get((row.get('roll_number') or '').upper())
+            if record['student_id'] is None:
+                raise ValueError(f"Unknown student for request row: {row}")
+            records.append(record)
+
+        # Move counters past tokens that arrive with the rows, before any are reserved
+        imported = {}
+        for record in records:
+            parsed = parse_token(record['token_number']) if record['token_number'] else None
+            if parsed:
+                request_type, year, sequence = parsed
+                imported[(request_type, year)] = max(imported.get((request_type, year), 0), sequence)
+        for (request_type, year), sequence in imported.items():
+            advance_sequence(conn, db, request_type, year, sequence)
+
+        # Reserve one block of tokens per (type, year) for rows without one
+        needed = {}
+        for record in records:
+            if not record['token_number']:
+                key = (record['request_type'], record['submitted_at'].year)
+                needed[key] = needed.get(key, 0) + 1
+        next_sequence = {}
+        for (request_type, year), count in needed.items():
+            last = reserve_sequence(conn, db, request_type, year, count)
+            next_sequence[(request_type, year)] = last - count + 1
+        for record in records:
+            if not record['token_number']:
+                key = (record['request_type'], record['submitted_at'].year)
+                record['token_number'] = format_token(key[0], key[1], next_sequence[key])
+                next_sequence[key] += 1
+
+        if conn.dialect.insert_executemany_returning:
+            new_ids = conn.execute(table.insert().returning(table.c.id), records).scalars().all()
+        else:
+            conn.execute(table.insert(), records)
+            new_ids = conn.execute(
+                select(table.c.id).where(table.c.token_number.in_([r['token_number'] for r in records]))
+            ).scalars().all()
+
+        # Core inserts bypass the ORM flush hook that maintains the search index
+        reindex_requests(conn, new_ids)
+        db.session.commit()
+        total += len(records)
+    return total
+
+
+# ==================== EXPORT ====================
+
+def _format_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_rows(db, kind, include_password_hash=False, chunk_size=1000):
+    """Yield export dicts for 'students' or 'requests' from a streaming cursor
+
+    Requests are exported from the live table first, then from the archive.
+    """
+    Student, _, ServiceRequest = init_models(db)
+    if kind == 'students':
+        columns = [Student.__table__.c[field] for field in STUDENT_FIELDS]
+        if include_password_hash:
+            columns.append(Student.__table__.c.password_hash)
+        statements = [select(*columns).order_by(Student.id)]
+    else:
+        statements = []
+        for table in (ServiceRequest.__table__, get_model(db, 'ArchivedRequest').__table__):
+            columns = [Student.__table__.c.roll_number if field == 'roll_number' else table.c[field]
+                       for field in REQUEST_FIELDS]
+            statements.append(select(*columns).join_from(table, Student.__table__).order_by(table.c.id))
+
+    for statement in statements:
+        result = db.session.execute(statement.execution_options(yield_per=chunk_size))
+        for row in result:
+            yield {key: _format_value(value) for key, value in row._mapping.items()}
+
+
+def write_rows(rows, fh, fmt):
+    """Write dicts to `fh` as CSV or JSONL, one row at a time"""
+    writer = None
+    for row in rows:
+        if fmt == 'csv':
+            if writer is None:
+                writer = csv.DictWriter(fh, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+        else:
+            fh.write(json.dumps(row) + '\n')
+
+
+def open_text(path, mode):
+    """Open a file for CSV/JSONL text I/O ('-' means stdin/stdout)"""
+    if path == '-':
+        return nullcontext(sys.stdin if 'r' in mode else sys.stdout)
+    return open(path, mode, encoding='utf-8', newline='')
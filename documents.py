@@ -0,0 +1,82 @@
+"""
+Document Serving for StudentHub
+Uploaded documents are served through an access-checked endpoint with HTTP
+Range support, strong ETags and 304 handling; transfers can be handed off to
+the front proxy with X-Accel-Redirect (nginx) or X-Sendfile (Apache, lighttpd)
+"""
+
+import mimetypes
+import os
+import re
+from flask import current_app, request, abort
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+
+# Document kinds that can be requested, mapped to their ServiceRequest column
+DOCUMENT_FIELDS = {
+    'id_proof': 'id_proof_path',
+    'photo': 'photo_path',
+    'fee_receipt': 'fee_receipt_path',
+    'additional_doc': 'additional_doc_path'
+}
+
+# Content-addressed blobs are named after their SHA-256 digest
+_BLOB_NAME = re.compile(r'^([0-9a-f]{64})\.\w+$')
+
+
+def document_path(service_request, document):
+    """Relative upload path of a request's document, or None"""
+    field = DOCUMENT_FIELDS.get(document)
+    return getattr(service_request, field) if field else None
+
+
+def send_document(service_request, document):
+    """Build the response for one document of `service_request`"""
+    relpath = document_path(service_request, document)
+    if not relpath:
+        abort(404)
+
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    full_path = safe_join(upload_folder, relpath)
+    if full_path is None or not os.path.isfile(full_path):
+        abort(404)
+
+    extension = relpath.rsplit('.', 1)[-1].lower()
+    download_name = f'{service_request.token_number}-{document}.{extension}'
+    max_age = current_app.config.get('DOCUMENT_CACHE_MAX_AGE', 3600)
+
+    # A blob's digest never changes for its path, so it is a strong ETag
+    match = _BLOB_NAME.match(os.path.basename(relpath))
+    etag = match.group(1) if match else True
+
+    mode = current_app.config.get('DOCUMENT_SENDFILE', '')
+    if mode == 'x-accel':
+        # nginx serves the bytes (including ranges) from an internal location
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+        )
+        response.headers['X-Accel-Redirect'] = \
+            current_app.config.get('DOCUMENT_ACCEL_PREFIX', '/protected-uploads/') + relpath
+        response.headers['Content-Disposition'] = f'inline; filename="{download_name}"'
+        if match:
+            response.set_etag(etag)
+            response.make_conditional(request)
+    else:
+        response = send_file(
+            full_path,
+            request.environ,
+            download_name=download_name,
+            conditional=True,
+            etag=etag,
+            max_age=max_age,
+            use_x_sendfile=(mode == 'x-sendfile'),
+            response_class=current_app.response_class
+        )
+
+    # Documents are personal - never let shared caches keep them
+    response.cache_control.private = True
+    response.cache_control.public = False
+    response.cache_control.max_age = max_age
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
@@ -0,0 +1,131 @@
+"""
+Database Engine Profile for StudentHub
+Production engine settings per backend: SQLite gets WAL journaling and tuned
+pragmas on every connection, PostgreSQL gets a connection pool sized from the
+gunicorn worker/thread counts, and live pool checkout statistics are kept
+for the diagnostics endpoint
+"""
+
+import os
+import threading
+import time
+from sqlalchemy import event
+
+
+def server_concurrency(environ=os.environ):
+    """(workers, threads per worker) as configured for gunicorn"""
+    workers = int(environ.get('WEB_CONCURRENCY', 1))
+    threads = int(environ.get('GUNICORN_THREADS', 1))
+    return max(1, workers), max(1, threads)
+
+
+def engine_options(database_uri, environ=os.environ):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database"""
+    if database_uri.startswith('sqlite'):
+        # Pragmas are applied in the connect hook; the driver timeout matches busy_timeout
+        return {
+            'connect_args': {'timeout': int(environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)) / 1000}
+        }
+
+    if database_uri.startswith('postgresql'):
+        workers, threads = server_concurrency(environ)
+        max_connections = int(environ.get('DB_MAX_CONNECTIONS', 100))
+        reserved = int(environ.get('DB_RESERVED_CONNECTIONS', 10))  # migrations, psql, cron
+
+        # Every request thread may hold one connection; overflow uses the
+        # remaining per-worker share of the server's connection limit
+        per_worker = max(1, (max_connections - reserved) // workers)
+        pool_size = min(threads, per_worker)
+        max_overflow = max(0, min(threads, per_worker - pool_size))
+        return {
+            'pool_size': pool_size,
+            'max_overflow': max_overflow,
+            'pool_pre_ping': True,
+            'pool_recycle': int(environ.get('DB_POOL_RECYCLE', 1800)),
+            'pool_timeout': int(environ.get('DB_POOL_TIMEOUT', 10))
+        }
+
+    return {'pool_pre_ping': True}
+
+
+class PoolStats:
+    """Counters fed by pool events"""
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidated = 0
+        self.max_checked_out = 0
+        self.longest_hold = 0.0
+        self._checked_out = 0
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'invalidated': self.invalidated,
+                'max_checked_out': self.max_checked_out,
+                'longest_hold_seconds': round(self.longest_hold, 4)
+            }
+
+
+pool_stats = PoolStats()
+
+
+def install_engine_hooks(engine, config):
+    """Attach connect pragmas (SQLite) and pool statistics to an engine"""
+    if engine.dialect.name == 'sqlite':
+        busy_timeout = config.get('SQLITE_BUSY_TIMEOUT_MS', 5000)
+        mmap_size = config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+        cache_kib = config.get('SQLITE_CACHE_KIB', 20000)
+
+        @event.listens_for(engine, 'connect')
+        def _sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            # WAL lets readers proceed while a writer commits
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout)}')
+            cursor.execute(f'PRAGMA mmap_size={int(mmap_size)}')
+            cursor.execute(f'PRAGMA cache_size=-{int(cache_kib)}')
+            cursor.execute('PRAGMA temp_store=MEMORY')
+            cursor.close()
+
+    @event.listens_for(engine, 'connect')
+    def _count_connect(dbapi_connection, connection_record):
+        with pool_stats._lock:
+            pool_stats.connects += 1
+
+    @event.listens_for(engine, 'checkout')
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info['checked_out_at'] = time.perf_counter()
+        with pool_stats._lock:
+            pool_stats.checkouts += 1
+            pool_stats._checked_out += 1
+            pool_stats.max_checked_out = max(pool_stats.max_checked_out, pool_stats._checked_out)
+
+    @event.listens_for(engine, 'checkin')
+    def _on_checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop('checked_out_at', None)
+        with pool_stats._lock:
+            pool_stats._checked_out = max(0, pool_stats._checked_out - 1)
+            if started is not None:
+                pool_stats.longest_hold = max(pool_stats.longest_hold, time.perf_counter() - started)
+
+    @event.listens_for(engine, 'invalidate')
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        with pool_stats._lock:
+            pool_stats.invalidated += 1
+
+
+def pool_status(engine):
+    """Live pool state plus the accumulated event counters"""
+    pool = engine.pool
+    status = {'pool_class': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, name):
+            status[name] = getattr(pool, name)()
+    status.update(pool_stats.snapshot())
+    return status
@@ -0,0 +1,275 @@
+"""
+Request List Exports for StudentHub
+Filtered worker request lists are streamed as CSV or XLSX while rows are read
+from a server-side cursor (yield_per), so memory stays flat however many rows
+match and the download starts with the first batch. XLSX workbooks are
+written by zipfile straight into the response stream
+"""
+
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+from sqlalchemy import select
+
+# (column key, header) exported for every request
+BASE_COLUMNS = (
+    ('token_number', 'Token'),
+    ('request_type', 'Service'),
+    ('full_name', 'Student Name'),
+    ('roll_number', 'Roll Number'),
+    ('department', 'Department'),
+    ('year', 'Year'),
+    ('status', 'Status'),
+    ('purpose', 'Purpose'),
+    ('remarks', 'Remarks'),
+    ('submitted_at', 'Submitted At'),
+    ('processed_at', 'Processed At'),
+    ('ready_at', 'Ready At'),
+    ('collected_at', 'Collected At')
+)
+
+# Added when railway requests can be part of the export
+RAILWAY_COLUMNS = (
+    ('from_station', 'From Station'),
+    ('to_station', 'To Station'),
+    ('journey_class', 'Class'),
+    ('duration', 'Duration')
+)
+
+_STUDENT_KEYS = ('full_name', 'roll_number', 'department', 'year')
+_RAILWAY_KEYS = {key for key, _ in RAILWAY_COLUMNS}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+# Rows fetched per round trip from the server-side cursor
+FETCH_ROWS = 1000
+
+# Rows buffered before a chunk is handed to the server
+FLUSH_ROWS = 500
+
+# Rows per worksheet in the XLSX format (including the header)
+XLSX_MAX_ROWS = 1048576
+
+
+def export_columns(service_filter=''):
+    """Columns for an export; railway columns only when railway rows can appear"""
+    if service_filter in ('', 'railway'):
+        return BASE_COLUMNS + RAILWAY_COLUMNS
+    return BASE_COLUMNS
+
+
+def export_statement(Student, ServiceRequest, columns):
+    """select() of the export columns, newest first (filters are applied by the caller)"""
+    fields = [getattr(Student if key in _STUDENT_KEYS else ServiceRequest, key).label(key)
+              for key, _ in columns]
+    return (
+        select(*fields)
+        .join(Student, ServiceRequest.student)
+        .order_by(ServiceRequest.submitted_at.desc(), ServiceRequest.id.desc())
+    )
+
+
+def _railway_only(row, columns):
+    """Row values in column order, with railway fields blank on other services"""
+    railway = row.request_type == 'railway'
+    return [None if key in _RAILWAY_KEYS and not railway else getattr(row, key) for key, _ in columns]
+
+
+# ==================== CSV ====================
+
+# Leading characters that make spreadsheet apps evaluate a cell as a formula
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        # Student-supplied text (names, purposes, remarks) must stay inert
+        return "'" + value
+    return '' if value is None else value
+
+
+def iter_csv(rows, columns):
+    """Yield CSV bytes in chunks of FLUSH_ROWS rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # The BOM makes Excel open the file as UTF-8
+    buffer.write('\ufeff')
+    writer.writerow([header for _, header in columns])
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_csv_value(value) for value in _railway_only(row, columns)])
+        if count % FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+# ==================== XLSX ====================
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Requests" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Style 1 is a date-time cell, style 2 a bold header cell
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" '
+    'activePane="bottomLeft" state="frozen"/></sheetView></sheetViews>'
+    '<sheetData>'
+)
+
+_SHEET_END = '</sheetData></worksheet>'
+
+# Characters XML 1.0 does not allow, even escaped
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_cell(ref, value, style=0):
+    if value is None or value == '':
+        return ''
+    if isinstance(value, date):
+        moment = value if isinstance(value, datetime) else datetime.combine(value, datetime.min.time())
+        serial = (moment - _EXCEL_EPOCH).total_seconds() / 86400
+        return f'<c r="{ref}" s="1"><v>{serial:.6f}</v></c>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    text = escape(_INVALID_XML.sub('', str(value)))
+    style_attr = f' s="{style}"' if style else ''
+    return f'<c r="{ref}" t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(number, values, letters, style=0):
+    cells = ''.join(_xlsx_cell(f'{letter}{number}', value, style) for letter, value in zip(letters, values))
+    return f'<row r="{number}">{cells}</row>'
+
+
+class _StreamSink:
+    """Write-only file object that zipfile fills and the response drains
+
+    It has no tell() or seek(), so zipfile writes in streaming mode (data
+    descriptors after each member).
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_xlsx(rows, columns):
+    """Yield an XLSX workbook (one sheet) in chunks of FLUSH_ROWS rows
+
+    Rows beyond the worksheet limit of XLSX_MAX_ROWS are left out.
+    """
+    sink = _StreamSink()
+    letters = [_column_letter(index) for index in range(len(columns))]
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        workbook.writestr('_rels/.rels', _ROOT_RELS)
+        workbook.writestr('xl/workbook.xml', _WORKBOOK)
+        workbook.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        workbook.writestr('xl/styles.xml', _STYLES)
+
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            parts = [_SHEET_START, _xlsx_row(1, [header for _, header in columns], letters, style=2)]
+            for number, row in enumerate(rows, 2):
+                if number > XLSX_MAX_ROWS:
+                    break
+                parts.append(_xlsx_row(number, _railway_only(row, columns), letters))
+                if number % FLUSH_ROWS == 0:
+                    sheet.write(''.join(parts).encode('utf-8'))
+                    parts = []
+                    yield sink.drain()
+            parts.append(_SHEET_END)
+            sheet.write(''.join(parts).encode('utf-8'))
+    yield sink.drain()
+
+
+def export_filename(extension, now=None):
+    return f"requests-{(now or datetime.now()).strftime('%Y%m%d-%H%M')}.{extension}"
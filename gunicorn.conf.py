@@ -0,0 +1,11 @@
+"""
+Gunicorn Settings for StudentHub
+Worker and thread counts come from the same environment variables that
+engine_profile.py uses to size the database connection pool
+"""
+
+import os
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
@@ -0,0 +1,78 @@
+"""
+Identity Cache for StudentHub
+load_user is served from a small per-process cache of user column values, so
+authenticated pages only read the user's auth_version stamp (one primary-key
+lookup) instead of the whole row. The stamp is bumped whenever profile,
+password or activation changes, so a change made by any process is seen on
+the next request.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, session
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import make_transient_to_detached
+
+# (user_type, user_id) -> (auth_version, column values, expires_at)
+_entries = OrderedDict()
+_lock = threading.Lock()
+
+
+def _store(key, user):
+    values = {attr.key: getattr(user, attr.key) for attr in user.__mapper__.column_attrs}
+    expires_at = time.monotonic() + current_app.config.get('IDENTITY_CACHE_TTL', 300)
+    max_size = current_app.config.get('IDENTITY_CACHE_SIZE', 10000)
+    with _lock:
+        _entries[key] = (user.auth_version, values, expires_at)
+        _entries.move_to_end(key)
+        while len(_entries) > max_size:
+            _entries.popitem(last=False)
+
+
+def _lookup(key, version):
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] != version or entry[2] < time.monotonic():
+            del _entries[key]
+            return None
+        _entries.move_to_end(key)
+        return entry[1]
+
+
+def load_identity(db, Model, user_type, user_id):
+    """Return the user for this session, from cache when the stamp is current"""
+    key = (user_type, user_id)
+    # The database stamp is authoritative; the session only carries a copy
+    version = db.session.execute(select(Model.auth_version).where(Model.id == user_id)).scalar()
+    values = _lookup(key, version) if version is not None else None
+    if values is not None:
+        if session.get('auth_version') != version:
+            session['auth_version'] = version
+        # Rebuild a detached copy and attach it without loading the row
+        user = Model(**values)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    user = db.session.get(Model, user_id)
+    if user is not None:
+        session['auth_version'] = user.auth_version
+        _store(key, user)
+    return user
+
+
+def refresh_identity(user_type, user):
+    """Forget a cached user after a change and carry the new stamp in the session"""
+    with _lock:
+        _entries.pop((user_type, user.id), None)
+    session['auth_version'] = user.auth_version
+
+
+def bump_auth_version(mapper, connection, target):
+    """before_update hook: advance the stamp when identity fields change"""
+    state = inspect(target)
+    tracked = target.IDENTITY_FIELDS
+    if any(state.attrs[field].history.has_changes() for field in tracked):
+        target.auth_version = (target.auth_version or 0) + 1
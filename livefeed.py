@@ -0,0 +1,259 @@
+"""
+Live Updates for StudentHub
+Request submissions and status changes are appended to a small SQLite
+journal shared by every worker process on the host, and each process wakes
+its Server-Sent Events streams through an in-process condition. Event ids
+are journal row ids, so a reconnecting browser resumes from Last-Event-ID
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from engine_profile import server_concurrency
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS live_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    audience TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL
+)
+"""
+
+WORKERS = 'workers'
+
+
+def student_audience(student_id):
+    return f'student:{student_id}'
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(_SCHEMA)
+    return conn
+
+
+class Broadcaster:
+    """Wakes local streams when the journal grows (from this or another process)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.latest_id = 0
+        self._condition = threading.Condition()
+        self._tail_pid = None
+        self._tail_lock = threading.Lock()
+
+    def announce(self, event_id, authoritative=False):
+        """Record a new latest id; the tail's reading of the journal may also lower it"""
+        with self._condition:
+            if event_id > self.latest_id:
+                self.latest_id = event_id
+                self._condition.notify_all()
+            elif authoritative:
+                # The journal was recreated and its ids restarted
+                self.latest_id = event_id
+
+    def wait(self, after_id, timeout):
+        """Block until an event newer than `after_id` exists; False on timeout"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.latest_id > after_id, timeout)
+
+    def ensure_tail(self, interval):
+        """Start (once per process) the thread that notices other processes' events"""
+        with self._tail_lock:
+            if self._tail_pid == os.getpid():
+                return
+            self._tail_pid = os.getpid()
+            thread = threading.Thread(target=self._tail, args=(interval,),
+                                      name='live-events-tail', daemon=True)
+            thread.start()
+
+    def _tail(self, interval):
+        conn = _connect(self.path)
+        while True:
+            latest = conn.execute('SELECT MAX(id) FROM live_events').fetchone()[0] or 0
+            self.announce(latest, authoritative=True)
+            time.sleep(interval)
+
+
+_broadcasters = {}
+_broadcasters_lock = threading.Lock()
+_last_prune = 0.0
+
+
+def broadcaster_for(path):
+    """The process-wide broadcaster of one journal file"""
+    with _broadcasters_lock:
+        if path not in _broadcasters:
+            _broadcasters[path] = Broadcaster(path)
+        return _broadcasters[path]
+
+
+def publish(events, config=None):
+    """Append (audience, kind, payload) events to the journal and wake streams"""
+    global _last_prune
+    if not events:
+        return
+    config = config or current_app.config
+    conn = _connect(config['LIVE_EVENTS_DB'])
+    try:
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        for audience, kind, payload in events:
+            conn.execute('INSERT INTO live_events (created, audience, kind, payload) VALUES (?, ?, ?, ?)',
+                         (now, audience, kind, json.dumps(payload, default=str)))
+        latest = conn.execute('SELECT MAX(id) FROM live_events').fetchone()[0]
+        if now - _last_prune > 60:
+            # Nobody resumes from further back than the retention window
+            conn.execute('DELETE FROM live_events WHERE created < ?',
+                         (now - config.get('LIVE_EVENTS_RETENTION', 3600),))
+            _last_prune = now
+        conn.execute('COMMIT')
+    finally:
+        conn.close()
+    broadcaster_for(config['LIVE_EVENTS_DB']).announce(latest)
+
+
+# ==================== TRANSACTION HOOKS ====================
+
+def queue_event(session, audience, kind, payload):
+    """Publish an event once the session's transaction commits (dropped on rollback)"""
+    session.info.setdefault('live_events', []).append((audience, kind, payload))
+
+
+def install_live_events(db, app):
+    """Flush queued events after every successful commit of the app's sessions"""
+    config = app.config
+
+    @event.listens_for(db.session, 'after_commit')
+    def _publish_queued(session):
+        events = session.info.pop('live_events', None)
+        if events:
+            try:
+                publish(events, config)
+            except sqlite3.Error as e:
+                # Live updates are best effort; the page still shows the truth on reload
+                app.logger.warning(f'Could not publish live events: {e}')
+
+    @event.listens_for(db.session, 'after_soft_rollback')
+    def _drop_queued(session, previous_transaction):
+        session.info.pop('live_events', None)
+
+    @app.template_global()
+    def live_updates():
+        """Whether pages should open /events/stream at all"""
+        return stream_limit(app) > 0
+
+
+def request_payload(request_id, token_number, request_type, status, from_status=None, submitted_at=None):
+    return {
+        'id': request_id,
+        'token_number': token_number,
+        'request_type': request_type,
+        'status': status,
+        'from_status': from_status,
+        'submitted_at': submitted_at.strftime('%d %b %Y') if submitted_at else None
+    }
+
+
+# ==================== STREAMING ====================
+
+def _format(event_id, kind, payload):
+    return f'id: {event_id}\nevent: {kind}\ndata: {payload}\n\n'
+
+
+def stream(audiences, last_event_id, config):
+    """Generator of SSE frames for `audiences`, ending after LIVE_STREAM_MAX_SECONDS"""
+    path = config['LIVE_EVENTS_DB']
+    heartbeat = config.get('LIVE_HEARTBEAT_SECONDS', 15)
+    deadline = time.monotonic() + config.get('LIVE_STREAM_MAX_SECONDS', 300)
+    broadcaster = broadcaster_for(path)
+    broadcaster.ensure_tail(config.get('LIVE_POLL_INTERVAL', 0.5))
+
+    conn = _connect(path)
+    placeholders = ', '.join('?' for _ in audiences)
+    try:
+        latest = conn.execute('SELECT MAX(id) FROM live_events').fetchone()[0] or 0
+        broadcaster.announce(latest)
+        # Resume after the client's last event, otherwise start from now
+        seen = last_event_id if last_event_id is not None and last_event_id <= latest else latest
+        yield f'retry: {int(config.get("LIVE_RETRY_MS", 3000))}\n\n'
+
+        while time.monotonic() < deadline:
+            top = conn.execute('SELECT MAX(id) FROM live_events').fetchone()[0] or 0
+            if top < seen:
+                # The journal was recreated; everything in it is new
+                seen = 0
+            if top > seen:
+                rows = conn.execute(
+                    f'SELECT id, kind, payload FROM live_events '
+                    f'WHERE id > ? AND id <= ? AND audience IN ({placeholders}) ORDER BY id',
+                    (seen, top, *audiences)
+                ).fetchall()
+                seen = top
+                for event_id, kind, payload in rows:
+                    yield _format(event_id, kind, payload)
+                continue
+            remaining = deadline - time.monotonic()
+            if not broadcaster.wait(seen, min(heartbeat, max(0.0, remaining))):
+                yield ': keepalive\n\n'
+    finally:
+        conn.close()
+
+
+def default_stream_limit(threads):
+    """Streams a worker accepts by default: half its threads, at least one
+
+    A single-threaded worker gets none - one open stream would block every
+    other request it serves.
+    """
+    return max(1, threads // 2) if threads > 1 else 0
+
+
+_disabled_logged = False
+
+
+def stream_limit(app):
+    """Concurrent streams this process accepts; logs once when live updates are off"""
+    global _disabled_logged
+    limit = app.config.get('LIVE_MAX_STREAMS')
+    explicit = limit is not None
+    if not explicit:
+        limit = default_stream_limit(server_concurrency()[1])
+    if limit < 1 and not _disabled_logged:
+        _disabled_logged = True
+        if explicit:
+            app.logger.warning('Live updates are off (LIVE_MAX_STREAMS=0)')
+        else:
+            app.logger.warning('Live updates are off: workers run a single thread. '
+                               'Set GUNICORN_THREADS above 1 (or LIVE_MAX_STREAMS) to enable them')
+    return limit
+
+
+class StreamSlots:
+    """Caps concurrent streams per process so they cannot take every request thread"""
+
+    def __init__(self):
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, limit):
+        with self._lock:
+            if self.active >= limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+
+stream_slots = StreamSlots()
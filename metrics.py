@@ -0,0 +1,272 @@
+"""
+Request Metrics for StudentHub
+Middleware that records per-endpoint latency, SQL statement count and time,
+template render time and upload bytes. Each worker process periodically
+writes its totals to a file in METRICS_DIR, and /metrics sums every file into
+the Prometheus text format, so the numbers cover all gunicorn workers
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from passwords import LATENCY_BUCKETS, LatencyHistogram, latency_snapshot
+
+# Upper bounds of the statements-per-request histogram
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+# Files of exited workers are folded into this one so their counts are kept
+_RETIRED_FILE = 'retired.json'
+
+_HELP = {
+    'studenthub_request_duration_seconds': ('histogram', 'Request latency by endpoint'),
+    'studenthub_request_sql_statements': ('histogram', 'SQL statements issued per request'),
+    'studenthub_template_render_seconds': ('histogram', 'Template render time'),
+    'studenthub_password_hash_seconds': ('histogram', 'Password hash/verify latency'),
+    'studenthub_requests_total': ('counter', 'Requests by endpoint, method and status'),
+    'studenthub_sql_seconds_total': ('counter', 'Time spent executing SQL, by endpoint'),
+    'studenthub_upload_bytes_total': ('counter', 'Multipart request body bytes, by endpoint')
+}
+
+
+class Registry:
+    """Per-process histograms and counters keyed by (metric, labels)"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = LatencyHistogram(buckets)
+            histogram = self.histograms[key]
+        histogram.observe(value)
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def snapshot(self):
+        """JSON-serialisable copy of every series"""
+        with self._lock:
+            histograms = list(self.histograms.items())
+            counters = list(self.counters.items())
+        return {
+            'histograms': [[name, dict(labels), histogram.snapshot()] for (name, labels), histogram in histograms],
+            'counters': [[name, dict(labels), value] for (name, labels), value in counters]
+        }
+
+
+registry = Registry()
+_last_flush = 0.0
+
+
+# ==================== COLLECTION ====================
+
+def _endpoint():
+    return request.endpoint or 'unmatched'
+
+
+def install_metrics(app, db):
+    """Attach the request, SQL and template hooks to `app` and its engine"""
+
+    @app.before_request
+    def _start_timer():
+        g._metrics = {'started': time.perf_counter(), 'statements': 0, 'sql_seconds': 0.0}
+
+    @app.after_request
+    def _record(response):
+        state = g.pop('_metrics', None)
+        if state is None:
+            return response
+        endpoint = _endpoint()
+        registry.observe('studenthub_request_duration_seconds',
+                         {'endpoint': endpoint, 'method': request.method},
+                         time.perf_counter() - state['started'])
+        registry.observe('studenthub_request_sql_statements', {'endpoint': endpoint},
+                         state['statements'], buckets=QUERY_COUNT_BUCKETS)
+        registry.inc('studenthub_requests_total',
+                     {'endpoint': endpoint, 'method': request.method, 'status': str(response.status_code)})
+        registry.inc('studenthub_sql_seconds_total', {'endpoint': endpoint}, state['sql_seconds'])
+        if request.mimetype == 'multipart/form-data' and request.content_length:
+            registry.inc('studenthub_upload_bytes_total', {'endpoint': endpoint}, request.content_length)
+        flush(app.config)
+        return response
+
+    def _before_render(sender, template, context, **extra):
+        if has_request_context():
+            g._metrics_render = time.perf_counter()
+
+    def _rendered(sender, template, context, **extra):
+        started = g.pop('_metrics_render', None) if has_request_context() else None
+        if started is not None:
+            registry.observe('studenthub_template_render_seconds',
+                             {'template': template.name or 'string'}, time.perf_counter() - started)
+
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_metrics_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['_metrics_started'].pop()
+        state = g.get('_metrics') if has_request_context() else None
+        if state is not None:
+            state['statements'] += 1
+            state['sql_seconds'] += time.perf_counter() - started
+
+
+# ==================== CROSS-PROCESS REGISTRY ====================
+
+def _metrics_dir(config):
+    path = config['METRICS_DIR']
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _write_json(path, data):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(data, fh)
+    os.replace(tmp, path)
+
+
+def flush(config, force=False):
+    """Write this process's totals to its file (at most once per interval)"""
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < config.get('METRICS_FLUSH_INTERVAL', 1.0):
+        return
+    _last_flush = now
+    data = registry.snapshot()
+    data['password'] = latency_snapshot()
+    _write_json(os.path.join(_metrics_dir(config), f'{os.getpid()}.json'), data)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merge(total, data):
+    """Add one process snapshot into the running totals"""
+    for name, labels, value in data.get('counters', []):
+        key = (name, tuple(sorted(labels.items())))
+        total['counters'][key] = total['counters'].get(key, 0) + value
+    histograms = list(data.get('histograms', []))
+    for series, snapshot in data.get('password', {}).items():
+        operation, scheme = series.split(':', 1)
+        histograms.append(['studenthub_password_hash_seconds',
+                           {'operation': operation, 'scheme': scheme}, snapshot])
+    for name, labels, snapshot in histograms:
+        key = (name, tuple(sorted(labels.items())))
+        merged = total['histograms'].setdefault(key, {'buckets': {}, 'count': 0, 'sum': 0.0})
+        for bound, count in snapshot['buckets'].items():
+            merged['buckets'][bound] = merged['buckets'].get(bound, 0) + count
+        merged['count'] += snapshot['count']
+        merged['sum'] += snapshot['sum']
+
+
+def _unmerge_to_json(total):
+    return {
+        'counters': [[name, dict(labels), value] for (name, labels), value in total['counters'].items()],
+        'histograms': [[name, dict(labels), snapshot] for (name, labels), snapshot in total['histograms'].items()]
+    }
+
+
+def collect(config):
+    """Sum the files of every live and retired worker"""
+    flush(config, force=True)
+    directory = _metrics_dir(config)
+    total = {'counters': {}, 'histograms': {}}
+
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        retired_path = os.path.join(directory, _RETIRED_FILE)
+        retired = {'counters': {}, 'histograms': {}}
+        if os.path.exists(retired_path):
+            with open(retired_path) as fh:
+                _merge(retired, json.load(fh))
+
+        dead = []
+        for name in os.listdir(directory):
+            stem, ext = os.path.splitext(name)
+            if ext != '.json' or not stem.isdigit():
+                continue
+            path = os.path.join(directory, name)
+            try:
+                with open(path) as fh:
+                    data = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            if _pid_alive(int(stem)):
+                _merge(total, data)
+            else:
+                _merge(retired, data)
+                dead.append(path)
+
+        if dead:
+            _write_json(retired_path, _unmerge_to_json(retired))
+            for path in dead:
+                os.remove(path)
+
+    _merge(total, _unmerge_to_json(retired))
+    return total
+
+
+# ==================== EXPOSITION ====================
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+def _number(value):
+    return int(value) if float(value).is_integer() else round(value, 6)
+
+
+def render_prometheus(total):
+    """Prometheus text exposition (version 0.0.4) of collected totals"""
+    lines = []
+    names = sorted({name for name, _ in total['histograms']} | {name for name, _ in total['counters']})
+    for name in names:
+        kind, help_text = _HELP.get(name, ('untyped', name))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'histogram':
+            for (series, labels), snapshot in sorted(total['histograms'].items()):
+                if series != name:
+                    continue
+                bounds = sorted((bound for bound in snapshot['buckets'] if bound != '+Inf'), key=float)
+                cumulative = 0
+                for bound in bounds + ['+Inf']:
+                    cumulative += snapshot['buckets'].get(bound, 0)
+                    lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {snapshot["sum"]:.6f}')
+                lines.append(f'{name}_count{_format_labels(labels)} {snapshot["count"]}')
+        else:
+            for (series, labels), value in sorted(total['counters'].items()):
+                if series == name:
+                    lines.append(f'{name}{_format_labels(labels)} {_number(value)}')
+    return '\n'.join(lines) + '\n'
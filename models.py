@@ -5,11 +5,29 @@ Models are defined as functions and initialized when needed to avoid circular im
 
 from datetime import datetime
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event, inspect, text
+from passwords import hash_password, verify_password, needs_rehash
 
 # Cache for model classes to avoid redefining tables
 _models_cache = {}
 
+# Columns added after the first release, created on older databases by upgrade_schema()
+_ADDED_COLUMNS = {
+    'students': {'auth_version': "INTEGER NOT NULL DEFAULT 1"},
+    'workers': {'auth_version': "INTEGER NOT NULL DEFAULT 1"}
+}
+
+# Token prefix per request type (RC-2026-0001, BC-2026-0001, ...)
+TOKEN_PREFIXES = {
+    'railway': 'RC',
+    'bonafide': 'BC',
+    'transfer': 'TC',
+    'scholarship': 'SC',
+    'exam': 'EX',
+    'library': 'LC',
+    'id_card': 'ID'
+}
+
 def init_models(db):
     """Initialize and return all model classes (cached)"""
     # Return cached models if already initialized
@@ -34,6 +52,10 @@ def init_models(db):
         division = db.Column(db.String(10))  # A, B, C, etc.
         phone_number = db.Column(db.String(15))
         
+        # Bumped on profile/password changes to invalidate cached identities
+        auth_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+        IDENTITY_FIELDS = ('full_name', 'phone_number', 'password_hash')
+        
         # Timestamps
         created_at = db.Column(db.DateTime, default=datetime.utcnow)
         updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -43,11 +65,15 @@ def init_models(db):
         
         def set_password(self, password):
             """Hash and set password"""
-            self.password_hash = generate_password_hash(password)
+            self.password_hash = hash_password(password)
         
         def check_password(self, password):
-            """Check if password is correct"""
-            return check_password_hash(self.password_hash, password)
+            """Check if password is correct (upgrading an outdated hash)"""
+            if not verify_password(self.password_hash, password):
+                return False
+            if needs_rehash(self.password_hash):
+                self.password_hash = hash_password(password)
+            return True
         
         def __repr__(self):
             return f'<Student {self.roll_number} - {self.full_name}>'
@@ -73,6 +99,10 @@ def init_models(db):
         role = db.Column(db.String(50), default='worker')  # worker, admin
         is_active = db.Column(db.Boolean, default=True)
         
+        # Bumped on profile/password/activation changes to invalidate cached identities
+        auth_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+        IDENTITY_FIELDS = ('full_name', 'phone_number', 'password_hash', 'is_active', 'role')
+        
         # Timestamps
         created_at = db.Column(db.DateTime, default=datetime.utcnow)
         updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -82,11 +112,15 @@ def init_models(db):
         
         def set_password(self, password):
             """Hash and set password"""
-            self.password_hash = generate_password_hash(password)
+            self.password_hash = hash_password(password)
         
         def check_password(self, password):
-            """Check if password is correct"""
-            return check_password_hash(self.password_hash, password)
+            """Check if password is correct (upgrading an outdated hash)"""
+            if not verify_password(self.password_hash, password):
+                return False
+            if needs_rehash(self.password_hash):
+                self.password_hash = hash_password(password)
+            return True
         
         def __repr__(self):
             return f'<Worker {self.employee_id} - {self.full_name}>'
@@ -96,6 +130,16 @@ def init_models(db):
     class ServiceRequest(db.Model):
         """Service request model for all student services"""
         __tablename__ = 'service_requests'
+        __table_args__ = (
+            # Covers the dashboard GROUP BY so it never touches the table rows
+            db.Index('ix_service_requests_status_type', 'status', 'request_type'),
+            # Keyset pagination on (submitted_at, id), with and without filters
+            db.Index('ix_service_requests_submitted_id', 'submitted_at', 'id'),
+            db.Index('ix_service_requests_status_submitted_id', 'status', 'submitted_at', 'id'),
+            db.Index('ix_service_requests_type_submitted_id', 'request_type', 'submitted_at', 'id'),
+            # Student history pages and per-student counts
+            db.Index('ix_service_requests_student_submitted_id', 'student_id', 'submitted_at', 'id'),
+        )
         
         id = db.Column(db.Integer, primary_key=True)
         token_number = db.Column(db.String(20), unique=True, nullable=False, index=True)
@@ -137,36 +181,17 @@ def init_models(db):
         collected_at = db.Column(db.DateTime)  # When student collects
         updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
         
+        # Finished requests move to ArchivedRequest (see archive.py)
+        archived = False
+        
         def __repr__(self):
             return f'<ServiceRequest {self.token_number} - Type: {self.request_type} - Status: {self.status}>'
         
         @staticmethod
         def generate_token_number(request_type='RC'):
             """Generate unique token number based on request type"""
-            year = datetime.now().year
-            
-            # Prefix based on request type
-            prefixes = {
-                'railway': 'RC',
-                'bonafide': 'BC',
-                'transfer': 'TC',
-                'scholarship': 'SC',
-                'exam': 'EX',
-                'library': 'LC',
-                'id_card': 'ID'
-            }
-            prefix = prefixes.get(request_type, 'SR')
-            
-            # Get the count of requests this year for this type
-            year_start = datetime(year, 1, 1)
-            count = ServiceRequest.query.filter(
-                ServiceRequest.submitted_at >= year_start,
-                ServiceRequest.request_type == request_type
-            ).count()
-            
-            # Generate token
-            token = f"{prefix}-{year}-{(count + 1):04d}"
-            return token
+            from tokens import allocate_token
+            return allocate_token(db, request_type)
         
         def get_status_color(self):
             """Get color for status badge"""
@@ -179,9 +204,206 @@ def init_models(db):
             }
             return colors.get(self.status, 'secondary')
     
+    # Cached identities are invalidated through the auth_version stamp
+    from identity import bump_auth_version
+    event.listen(Student, 'before_update', bump_auth_version)
+    event.listen(Worker, 'before_update', bump_auth_version)
+    
+    # ==================== TOKEN COUNTER MODEL ====================
+    
+    class TokenCounter(db.Model):
+        """Last issued token sequence per request type and year"""
+        __tablename__ = 'token_counters'
+        
+        request_type = db.Column(db.String(50), primary_key=True)
+        year = db.Column(db.Integer, primary_key=True)
+        last_value = db.Column(db.Integer, nullable=False, default=0)
+        
+        def __repr__(self):
+            return f'<TokenCounter {self.request_type} {self.year}: {self.last_value}>'
+    
+    # ==================== UPLOAD BLOB MODEL ====================
+    
+    class UploadBlob(db.Model):
+        """Content-addressed uploaded file shared by every request that references it"""
+        __tablename__ = 'upload_blobs'
+        
+        sha256 = db.Column(db.String(64), primary_key=True)
+        path = db.Column(db.String(255), unique=True, nullable=False)  # ab/cd/<sha256>.<ext>
+        size = db.Column(db.BigInteger, nullable=False)
+        ref_count = db.Column(db.Integer, nullable=False, default=0)
+        created_at = db.Column(db.DateTime, default=datetime.utcnow)
+        
+        def __repr__(self):
+            return f'<UploadBlob {self.path} refs={self.ref_count}>'
+    
+    # ==================== STATUS EVENT MODEL ====================
+    
+    class RequestStatusEvent(db.Model):
+        """Append-only record of every status a request moved through"""
+        __tablename__ = 'request_status_events'
+        __table_args__ = (
+            # A request's history in order
+            db.Index('ix_status_events_request_occurred', 'request_id', 'occurred_at'),
+            # Transitions per type over a period
+            db.Index('ix_status_events_type_occurred', 'request_type', 'occurred_at'),
+        )
+        
+        id = db.Column(db.Integer, primary_key=True)
+        request_id = db.Column(db.Integer, db.ForeignKey('service_requests.id'), nullable=False)
+        request_type = db.Column(db.String(50), nullable=False)
+        from_status = db.Column(db.String(20))  # NULL for the submission event
+        to_status = db.Column(db.String(20), nullable=False)
+        worker_id = db.Column(db.Integer, db.ForeignKey('workers.id'), nullable=True)
+        occurred_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+        
+        def __repr__(self):
+            return f'<RequestStatusEvent {self.request_id}: {self.from_status} -> {self.to_status}>'
+    
+    # ==================== TURNAROUND ROLLUP MODEL ====================
+    
+    class TurnaroundRollup(db.Model):
+        """Daily histogram of turnaround durations per request type and stage"""
+        __tablename__ = 'turnaround_rollups'
+        
+        day = db.Column(db.Date, primary_key=True)
+        request_type = db.Column(db.String(50), primary_key=True)
+        metric = db.Column(db.String(30), primary_key=True)  # submit_to_ready, ready_to_collected
+        bucket = db.Column(db.Integer, primary_key=True)     # index into analytics.DURATION_BUCKETS
+        count = db.Column(db.Integer, nullable=False, default=0)
+        total_seconds = db.Column(db.Float, nullable=False, default=0)
+        
+        def __repr__(self):
+            return f'<TurnaroundRollup {self.day} {self.request_type} {self.metric}[{self.bucket}]={self.count}>'
+    
+    # ==================== ARCHIVE MODELS ====================
+    
+    class ArchivedRequest(db.Model):
+        """Finished service request moved out of service_requests (same id and columns)"""
+        __tablename__ = 'archived_requests'
+        __table_args__ = (
+            # Student history pages, merged with the live table on (submitted_at, id)
+            db.Index('ix_archived_requests_student_submitted_id', 'student_id', 'submitted_at', 'id'),
+            # Filtered searches and exports over the archive
+            db.Index('ix_archived_requests_status_type_id', 'status', 'request_type', 'id'),
+        )
+        
+        id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+        token_number = db.Column(db.String(20), unique=True, nullable=False, index=True)
+        request_type = db.Column(db.String(50), nullable=False)
+        student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
+        processed_by = db.Column(db.Integer, db.ForeignKey('workers.id'), nullable=True)
+        from_station = db.Column(db.String(100))
+        to_station = db.Column(db.String(100))
+        journey_class = db.Column(db.String(20))
+        duration = db.Column(db.String(50))
+        purpose = db.Column(db.String(200))
+        status = db.Column(db.String(20), nullable=False)
+        id_proof_path = db.Column(db.String(255))
+        fee_receipt_path = db.Column(db.String(255))
+        photo_path = db.Column(db.String(255))
+        additional_doc_path = db.Column(db.String(255))
+        address = db.Column(db.Text)
+        remarks = db.Column(db.Text)
+        submitted_at = db.Column(db.DateTime, nullable=False)
+        processed_at = db.Column(db.DateTime)
+        ready_at = db.Column(db.DateTime)
+        collected_at = db.Column(db.DateTime)
+        updated_at = db.Column(db.DateTime)
+        archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+        
+        student = db.relationship('Student', lazy=True)
+        processor = db.relationship('Worker', lazy=True)
+        
+        # Archived requests are read-only
+        archived = True
+        
+        def __repr__(self):
+            return f'<ArchivedRequest {self.token_number} - Type: {self.request_type} - Status: {self.status}>'
+    
+    class ArchivedStatusEvent(db.Model):
+        """Status history of an archived request (moved from request_status_events)"""
+        __tablename__ = 'archived_status_events'
+        __table_args__ = (
+            db.Index('ix_archived_status_events_request_occurred', 'request_id', 'occurred_at'),
+        )
+        
+        id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+        request_id = db.Column(db.Integer, db.ForeignKey('archived_requests.id'), nullable=False)
+        request_type = db.Column(db.String(50), nullable=False)
+        from_status = db.Column(db.String(20))
+        to_status = db.Column(db.String(20), nullable=False)
+        worker_id = db.Column(db.Integer, db.ForeignKey('workers.id'), nullable=True)
+        occurred_at = db.Column(db.DateTime, nullable=False)
+        
+        def __repr__(self):
+            return f'<ArchivedStatusEvent {self.request_id}: {self.from_status} -> {self.to_status}>'
+    
+    # ==================== DAILY QUOTA MODEL ====================
+    
+    class DailyQuota(db.Model):
+        """Submissions taken per day and request type (limits live in config)"""
+        __tablename__ = 'daily_quotas'
+        
+        day = db.Column(db.Date, primary_key=True)
+        request_type = db.Column(db.String(50), primary_key=True)
+        used = db.Column(db.Integer, nullable=False, default=0)
+        
+        def __repr__(self):
+            return f'<DailyQuota {self.day} {self.request_type}: {self.used}>'
+    
     # Cache models before returning
     _models_cache['Student'] = Student
     _models_cache['Worker'] = Worker
     _models_cache['ServiceRequest'] = ServiceRequest
+    _models_cache['TokenCounter'] = TokenCounter
+    _models_cache['UploadBlob'] = UploadBlob
+    _models_cache['RequestStatusEvent'] = RequestStatusEvent
+    _models_cache['TurnaroundRollup'] = TurnaroundRollup
+    _models_cache['DailyQuota'] = DailyQuota
+    _models_cache['ArchivedRequest'] = ArchivedRequest
+    _models_cache['ArchivedStatusEvent'] = ArchivedStatusEvent
+    
+    # Keep the worker search index and upload reference counts in sync with every flush
+    from search import install_search_sync
+    from storage import install_reference_tracking
+    install_search_sync(db, Student, ServiceRequest)
+    install_reference_tracking(db, ServiceRequest)
     
     return Student, Worker, ServiceRequest
+
+
+def get_model(db, name):
+    """Return a single model class by name, initializing models on first use"""
+    init_models(db)
+    return _models_cache[name]
+
+
+def insert_if_missing(conn, table, values, keys):
+    """INSERT a row, doing nothing if one with the same `keys` already exists"""
+    dialect = conn.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy import insert
+        conn.execute(insert(table).values(**values))
+        return
+    conn.execute(insert(table).values(**values).on_conflict_do_nothing(index_elements=keys))
+
+
+def upgrade_schema(db):
+    """Bring tables created by an older release up to date (columns and indexes)"""
+    init_models(db)
+    with db.engine.begin() as conn:
+        inspector = inspect(conn)
+        for table_name, columns in _ADDED_COLUMNS.items():
+            existing = {column['name'] for column in inspector.get_columns(table_name)}
+            for name, ddl in columns.items():
+                if name not in existing:
+                    conn.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {name} {ddl}'))
+        # create_all() skips indexes on tables that already exist
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
@@ -0,0 +1,82 @@
+"""
+Rendered Page Cache for StudentHub
+Pages whose HTML depends only on the template and a few user fields are
+rendered once per distinct set of values and then served from a per-process
+cache with a strong ETag, so repeat visits skip Jinja and revalidations get
+304 Not Modified. There is no explicit invalidation: a page is keyed on every
+value it shows, so a profile edit renders under a new key, and superseded
+entries age out after PAGE_CACHE_TTL or fall off the LRU end
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, make_response, render_template, request, session
+
+# (template, vary items) -> (body, etag, expires_at)
+_entries = OrderedDict()
+_lock = threading.Lock()
+
+# template -> whether its source displays flashed messages
+_flash_templates = {}
+
+
+def _shows_flashes(template_name):
+    if template_name not in _flash_templates:
+        env = current_app.jinja_env
+        source = env.loader.get_source(env, template_name)[0]
+        _flash_templates[template_name] = 'get_flashed_messages' in source
+    return _flash_templates[template_name]
+
+
+def _lookup(key):
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] < time.monotonic():
+            del _entries[key]
+            return None
+        _entries.move_to_end(key)
+        return entry
+
+
+def _store(key, body, etag):
+    ttl = current_app.config.get('PAGE_CACHE_TTL', 300)
+    max_size = current_app.config.get('PAGE_CACHE_SIZE', 5000)
+    with _lock:
+        _entries[key] = (body, etag, time.monotonic() + ttl)
+        _entries.move_to_end(key)
+        while len(_entries) > max_size:
+            _entries.popitem(last=False)
+
+
+def cached_page(template_name, **vary):
+    """Render `template_name` through the cache; `vary` holds every value the HTML depends on"""
+    # Pending flash messages must reach a template that shows them, and
+    # template edits show up immediately while developing
+    if ((session.get('_flashes') and _shows_flashes(template_name)) or current_app.debug
+            or not current_app.config.get('PAGE_CACHE_TTL', 300)):
+        return render_template(template_name)
+
+    key = (template_name, tuple(sorted(vary.items())))
+    entry = _lookup(key)
+    if entry is None:
+        body = render_template(template_name)
+        etag = hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
+        _store(key, body, etag)
+        status = 'MISS'
+    else:
+        body, etag = entry[0], entry[1]
+        status = 'HIT'
+
+    response = make_response(body)
+    response.set_etag(etag)
+    # Personalised HTML: browsers may keep it but must revalidate every time
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    response.headers['X-Page-Cache'] = status
+    return response.make_conditional(request)
+
@@ -0,0 +1,109 @@
+"""
+Keyset (Cursor) Pagination for StudentHub
+Request lists are paged with a range condition on (submitted_at, id) so every
+page is an index range scan instead of an OFFSET over a full sort
+"""
+
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+
+
+class KeysetPage:
+    """One page of results plus the cursors for its neighbours"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def encode_cursor(row):
+    """Encode the (submitted_at, id) position of a row as an opaque token"""
+    raw = f'{row.submitted_at.isoformat()}|{row.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor token, returning None for missing or tampered values"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        submitted_at, row_id = raw.split('|')
+        return datetime.fromisoformat(submitted_at), int(row_id)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+def paginate_requests(query, ServiceRequest, page_size, after=None, before=None):
+    """Return a KeysetPage of `query` ordered newest first
+
+    `after` continues towards older rows, `before` goes back towards newer
+    ones. Both are cursor strings produced by encode_cursor().
+    """
+    return paginate_merged([(query, ServiceRequest)], page_size, after=after, before=before)
+
+
+def paginate_merged(sources, page_size, after=None, before=None):
+    """paginate_requests() over several (query, model) sources sharing one id space
+
+    Each source is paged on its own (submitted_at, id) index and the pages
+    are merged, so every extra source (the archive) costs one bounded query.
+    """
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before)
+
+    def position(row):
+        return row.submitted_at, row.id
+
+    if before_key:
+        # Walk forwards in ascending order, then flip back to newest first
+        rows = []
+        for query, model in sources:
+            key = tuple_(model.submitted_at, model.id)
+            rows.extend(query.filter(key > tuple_(*before_key)).order_by(
+                model.submitted_at.asc(), model.id.asc()
+            ).limit(page_size + 1).all())
+        if rows:
+            rows.sort(key=position)
+            has_newer = len(rows) > page_size
+            rows = rows[:page_size]
+            rows.reverse()
+            return KeysetPage(rows,
+                              next_cursor=encode_cursor(rows[-1]),
+                              prev_cursor=encode_cursor(rows[0]) if has_newer else None)
+        # Nothing newer any more - fall back to the first page
+        after_key = None
+
+    rows = []
+    for query, model in sources:
+        if after_key:
+            query = query.filter(tuple_(model.submitted_at, model.id) < tuple_(*after_key))
+        rows.extend(query.order_by(
+            model.submitted_at.desc(), model.id.desc()
+        ).limit(page_size + 1).all())
+    rows.sort(key=position, reverse=True)
+    has_older = len(rows) > page_size
+    rows = rows[:page_size]
+
+    return KeysetPage(rows,
+                      next_cursor=encode_cursor(rows[-1]) if has_older else None,
+                      prev_cursor=encode_cursor(rows[0]) if rows and after_key else None)
+
+
+def get_page_size(args, default, maximum):
+    """Read an optional per_page argument, clamped to [1, maximum]"""
+    try:
+        size = int(args.get('per_page', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
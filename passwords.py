@@ -0,0 +1,185 @@
+"""
+Password Hashing for StudentHub
+Hashes are produced by a configurable backend (scrypt, pbkdf2 or bcrypt) on a
+small bounded thread pool, so a burst of logins cannot occupy every request
+thread with key stretching. Hashes made with older parameters are upgraded
+on the next successful login.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+DEFAULTS = {
+    'PASSWORD_HASH_METHOD': 'scrypt',
+    'PASSWORD_SCRYPT_N': 32768,
+    'PASSWORD_PBKDF2_ITERATIONS': 600000,
+    'PASSWORD_BCRYPT_ROUNDS': 12,
+    'PASSWORD_HASH_WORKERS': 2,
+    'PASSWORD_HASH_QUEUE': 16,
+    'PASSWORD_HASH_TIMEOUT': 10
+}
+
+
+class HashingBusy(RuntimeError):
+    """Raised when the hashing pool and its queue are full"""
+
+
+class LatencyHistogram:
+    """Thread-safe cumulative histogram of operation latencies"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    self.counts[index] += 1
+                    break
+            else:
+                self.counts[-1] += 1
+            self.total += seconds
+
+    def snapshot(self):
+        """Bucket counts keyed by upper bound ('+Inf' last), plus count and sum"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.total
+        labels = [str(bound) for bound in self.buckets] + ['+Inf']
+        return {'buckets': dict(zip(labels, counts)), 'count': sum(counts), 'sum': round(total, 6)}
+
+
+# (operation, scheme) -> LatencyHistogram
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+# Per-process pool; recreated after a fork
+_executor = None
+_executor_pid = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+def _setting(name):
+    if has_app_context():
+        return current_app.config.get(name, DEFAULTS[name])
+    return DEFAULTS[name]
+
+
+def method_string(scheme=None):
+    """Method descriptor for the configured scheme, e.g. 'scrypt:32768:8:1'"""
+    scheme = scheme or _setting('PASSWORD_HASH_METHOD')
+    if scheme == 'scrypt':
+        return f"scrypt:{_setting('PASSWORD_SCRYPT_N')}:8:1"
+    if scheme == 'pbkdf2':
+        return f"pbkdf2:sha256:{_setting('PASSWORD_PBKDF2_ITERATIONS')}"
+    if scheme == 'bcrypt':
+        return f"bcrypt:{_setting('PASSWORD_BCRYPT_ROUNDS')}"
+    raise ValueError(f'Unknown password hash method: {scheme}')
+
+
+def _scheme_of(method):
+    return method.split(':', 1)[0]
+
+
+def hash_with_method(password, method):
+    """Hash synchronously with an explicit method descriptor (no app context needed)"""
+    if _scheme_of(method) == 'bcrypt':
+        import bcrypt
+        rounds = int(method.split(':')[1])
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+    return generate_password_hash(password, method=method)
+
+
+def _verify_sync(password_hash, password):
+    if password_hash.startswith('$2'):
+        import bcrypt
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    return check_password_hash(password_hash, password)
+
+
+def _hash_method_of(password_hash):
+    """Method descriptor a stored hash was made with"""
+    if password_hash.startswith('$2'):
+        # $2b$12$...
+        return f"bcrypt:{int(password_hash.split('$')[2])}"
+    return password_hash.split('$', 1)[0]
+
+
+def _histogram(operation, scheme):
+    key = (operation, scheme)
+    with _histograms_lock:
+        if key not in _histograms:
+            _histograms[key] = LatencyHistogram()
+        return _histograms[key]
+
+
+def _get_executor():
+    global _executor, _executor_pid, _slots
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            workers = _setting('PASSWORD_HASH_WORKERS')
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            _slots = threading.BoundedSemaphore(workers + _setting('PASSWORD_HASH_QUEUE'))
+            _executor_pid = os.getpid()
+        return _executor, _slots
+
+
+def _run_bounded(operation, scheme, func, *args):
+    """Run `func` on the hashing pool, timing it and shedding load when full"""
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        raise HashingBusy('Password hashing is saturated, try again shortly')
+
+    def timed():
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            _histogram(operation, scheme).observe(time.perf_counter() - started)
+
+    try:
+        future = executor.submit(timed)
+    except BaseException:
+        slots.release()
+        raise
+    # The slot is held until the hash finishes, not until the caller stops
+    # waiting, so timed-out hashes still count against the bound
+    future.add_done_callback(lambda _: slots.release())
+    return future.result(timeout=_setting('PASSWORD_HASH_TIMEOUT'))
+
+
+def hash_password(password):
+    """Hash a password with the configured method"""
+    method = method_string()
+    return _run_bounded('hash', _scheme_of(method), hash_with_method, password, method)
+
+
+def verify_password(password_hash, password):
+    """Check a password against any supported stored hash"""
+    if not password_hash or password is None:
+        return False
+    scheme = _scheme_of(_hash_method_of(password_hash))
+    return _run_bounded('verify', scheme, _verify_sync, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """Whether a stored hash was made with other than the configured parameters"""
+    return _hash_method_of(password_hash) != method_string()
+
+
+def latency_snapshot():
+    """Histogram snapshots keyed by 'operation:scheme'"""
+    with _histograms_lock:
+        items = list(_histograms.items())
+    return {f'{operation}:{scheme}': histogram.snapshot() for (operation, scheme), histogram in items}
@@ -0,0 +1,92 @@
+"""
+Daily Request Quotas for StudentHub
+Submissions are counted per day and request type in daily_quotas. A slot is
+reserved with one conditional UPDATE (used < limit) on the submission's own
+transaction, so concurrent submissions cannot oversubscribe a day and a
+failed submission hands its slot back when it rolls back
+"""
+
+from datetime import date
+from flask import current_app
+from sqlalchemy import select, update
+from models import TOKEN_PREFIXES, get_model, insert_if_missing
+
+
+class QuotaExceeded(ValueError):
+    """The day's limit for a request type has been reached"""
+
+    def __init__(self, request_type, limit):
+        self.request_type = request_type
+        self.limit = limit
+        super().__init__(
+            f"Today's limit of {limit} {request_type.replace('_', ' ')} applications has been reached. "
+            "Please apply again tomorrow."
+        )
+
+
+def daily_limit(request_type, config=None):
+    """Configured limit for a request type, or None when it is unlimited"""
+    config = config or current_app.config
+    return config.get('DAILY_REQUEST_LIMITS', {}).get(request_type)
+
+
+def reserve_quota(conn, db, request_type, day=None, count=1):
+    """Atomically take `count` of the day's slots for `request_type`
+
+    Raises QuotaExceeded when fewer than `count` remain. The caller owns the
+    transaction on `conn`; the counter row stays locked until it commits,
+    and a rollback returns the slots.
+    """
+    day = day or date.today()
+    limit = daily_limit(request_type)
+    table = get_model(db, 'DailyQuota').__table__
+    match = (table.c.day == day) & (table.c.request_type == request_type)
+    if limit is not None:
+        match &= table.c.used + count <= limit
+    bump = update(table).where(match).values(used=table.c.used + count)
+
+    if conn.execute(bump).rowcount == 0:
+        # First submission of the day, or the day is full
+        insert_if_missing(conn, table, {
+            'day': day,
+            'request_type': request_type,
+            'used': 0
+        }, ['day', 'request_type'])
+        if conn.execute(bump).rowcount == 0:
+            raise QuotaExceeded(request_type, limit)
+
+
+def check_quota(db, request_type, day=None):
+    """Cheap read-only check so a full day is rejected before uploads are stored
+
+    reserve_quota() stays authoritative; this only avoids wasted work.
+    """
+    limit = daily_limit(request_type)
+    if limit is None:
+        return
+    table = get_model(db, 'DailyQuota').__table__
+    used = db.session.execute(
+        select(table.c.used).where(table.c.day == (day or date.today()),
+                                   table.c.request_type == request_type)
+    ).scalar()
+    if (used or 0) >= limit:
+        raise QuotaExceeded(request_type, limit)
+
+
+def remaining_capacity(db, day=None):
+    """[{request_type, used, limit, remaining}] for every request type on `day`"""
+    table = get_model(db, 'DailyQuota').__table__
+    used = dict(db.session.execute(
+        select(table.c.request_type, table.c.used).where(table.c.day == (day or date.today()))
+    ).all())
+    capacity = []
+    for request_type in TOKEN_PREFIXES:
+        limit = daily_limit(request_type)
+        taken = used.get(request_type, 0)
+        capacity.append({
+            'request_type': request_type,
+            'used': taken,
+            'limit': limit,
+            'remaining': None if limit is None else max(0, limit - taken)
+        })
+    return capacity
@@ -0,0 +1,337 @@
+"""
+Request Search Index for StudentHub
+Token, roll number, name, email and stations are indexed in a side table
+(FTS5 on SQLite, tsvector + trigram on PostgreSQL) that is kept in sync from
+the ORM flush, so worker searches are ranked index lookups instead of
+leading-wildcard scans
+"""
+
+import re
+from sqlalchemy import column, event, inspect, or_, table, text
+
+SEARCH_TABLE = 'request_search'
+
+# Fields copied into the index, in FTS5 column order
+SEARCH_FIELDS = ('token_number', 'roll_number', 'full_name', 'email', 'from_station', 'to_station')
+
+# Student attributes that appear in the index
+_STUDENT_FIELDS = ('roll_number', 'full_name', 'email')
+_REQUEST_FIELDS = ('token_number', 'from_station', 'to_station', 'student_id')
+
+# Archived requests stay searchable, so index rows come from both tables
+_ROWS_SQL = """
+    SELECT sr.id, sr.token_number, s.roll_number, s.full_name, s.email,
+           sr.from_station, sr.to_station
+    FROM (
+        SELECT id, token_number, student_id, from_station, to_station FROM service_requests
+        UNION ALL
+        SELECT id, token_number, student_id, from_station, to_station FROM archived_requests
+    ) sr JOIN students s ON s.id = sr.student_id
+"""
+
+_ARCHIVED_REQUESTS = table('archived_requests', column('id'), column('student_id'))
+
+# Tables an index row's request can live in, checked by primary key when filtering
+_REQUEST_TABLES = ('service_requests', 'archived_requests')
+
+# Per-process flags
+_listener_installed = False
+_available = None
+
+
+def _backend(bind):
+    """Search backend for a connection or engine: 'fts5', 'postgresql' or None"""
+    name = bind.dialect.name
+    if name == 'sqlite':
+        return 'fts5'
+    if name == 'postgresql':
+        return 'postgresql'
+    return None
+
+
+def _index_available(conn):
+    """Whether the search table exists (checked once per process)"""
+    global _available
+    if _available is None:
+        _available = _backend(conn) is not None and inspect(conn).has_table(SEARCH_TABLE)
+    return _available
+
+
+# ==================== SCHEMA ====================
+
+def create_search_index(db):
+    """Create the search table if needed; returns True when it was just created"""
+    global _available
+    with db.engine.begin() as conn:
+        backend = _backend(conn)
+        if backend is None or inspect(conn).has_table(SEARCH_TABLE):
+            _available = backend is not None
+            return False
+
+        if backend == 'fts5':
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+                f"{', '.join(SEARCH_FIELDS)}, tokenize='unicode61 remove_diacritics 2')"
+            ))
+        else:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text(
+                f"CREATE TABLE {SEARCH_TABLE} ("
+                "request_id INTEGER PRIMARY KEY, document TEXT NOT NULL, tsv TSVECTOR NOT NULL)"
+            ))
+            conn.execute(text(
+                f"CREATE INDEX ix_{SEARCH_TABLE}_tsv ON {SEARCH_TABLE} USING GIN (tsv)"
+            ))
+            conn.execute(text(
+                f"CREATE INDEX ix_{SEARCH_TABLE}_trgm ON {SEARCH_TABLE} USING GIN (document gin_trgm_ops)"
+            ))
+
+    _available = True
+    return True
+
+
+def rebuild_search_index(db, batch_size=1000):
+    """Re-index every request in id order; returns the number of rows indexed"""
+    total = 0
+    last_id = 0
+    while True:
+        with db.engine.begin() as conn:
+            rows = conn.execute(
+                text(_ROWS_SQL + " WHERE sr.id > :last_id ORDER BY sr.id LIMIT :limit"),
+                {'last_id': last_id, 'limit': batch_size}
+            ).all()
+            if not rows:
+                return total
+            _write_rows(conn, rows)
+        total += len(rows)
+        last_id = rows[-1][0]
+
+
+# ==================== SYNC ====================
+
+def _write_rows(conn, rows):
+    """Upsert index rows for (id, token, roll, name, email, from, to) tuples"""
+    if not rows:
+        return
+    if _backend(conn) == 'fts5':
+        conn.execute(
+            text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"),
+            [{'id': row[0]} for row in rows]
+        )
+        conn.execute(
+            text(f"INSERT INTO {SEARCH_TABLE} (rowid, {', '.join(SEARCH_FIELDS)}) "
+                 f"VALUES (:id, {', '.join(':' + f for f in SEARCH_FIELDS)})"),
+            [dict(zip(('id',) + SEARCH_FIELDS, row)) for row in rows]
+        )
+    else:
+        conn.execute(text(f"""
+            INSERT INTO {SEARCH_TABLE} (request_id, document, tsv)
+            VALUES (:id, :document,
+                    setweight(to_tsvector('simple', :token_number), 'A') ||
+                    setweight(to_tsvector('simple', :person), 'B') ||
+                    setweight(to_tsvector('simple', :contact), 'C'))
+            ON CONFLICT (request_id) DO UPDATE
+            SET document = EXCLUDED.document, tsv = EXCLUDED.tsv
+        """), [{
+            'id': row[0],
+            'document': ' '.join(value for value in row[1:] if value),
+            'token_number': row[1] or '',
+            'person': f'{row[2] or ""} {row[3] or ""}',
+            'contact': f'{row[4] or ""} {row[5] or ""} {row[6] or ""}'
+        } for row in rows])
+
+
+def reindex_requests(conn, request_ids):
+    """Refresh the index rows of the given request ids on `conn`"""
+    request_ids = list(request_ids)
+    if not request_ids or not _index_available(conn):
+        return
+    for start in range(0, len(request_ids), 500):
+        chunk = request_ids[start:start + 500]
+        rows = conn.execute(
+            text(_ROWS_SQL + " WHERE sr.id IN ({})".format(
+                ', '.join(str(int(request_id)) for request_id in chunk)
+            ))
+        ).all()
+        _write_rows(conn, rows)
+
+
+def _changed(obj, fields):
+    """Whether any of `fields` was modified on a flushed instance"""
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def install_search_sync(db, Student, ServiceRequest):
+    """Keep the index in step with every flush of the Flask-SQLAlchemy session"""
+    global _listener_installed
+    if _listener_installed:
+        return
+    _listener_installed = True
+
+    @event.listens_for(db.session, 'after_flush')
+    def _sync_search_index(session, flush_context):
+        request_ids = set()
+        student_ids = set()
+        for obj in session.new:
+            if isinstance(obj, ServiceRequest):
+                request_ids.add(obj.id)
+        for obj in session.dirty:
+            if isinstance(obj, ServiceRequest) and _changed(obj, _REQUEST_FIELDS):
+                request_ids.add(obj.id)
+            elif isinstance(obj, Student) and _changed(obj, _STUDENT_FIELDS):
+                student_ids.add(obj.id)
+        if not request_ids and not student_ids:
+            return
+
+        conn = session.connection()
+        if student_ids:
+            for requests_table in (ServiceRequest.__table__, _ARCHIVED_REQUESTS):
+                request_ids.update(conn.execute(
+                    requests_table.select()
+                    .with_only_columns(requests_table.c.id)
+                    .where(requests_table.c.student_id.in_(student_ids))
+                ).scalars())
+        reindex_requests(conn, request_ids)
+
+
+# ==================== QUERY ====================
+
+def _terms(query_text):
+    """Split free text into at most eight word terms"""
+    return re.findall(r'\w+', query_text.lower())[:8]
+
+
+def _state_filter(id_column, request_type=None, status=None):
+    """(WHERE predicate, params) limiting index rows by type and status
+
+    Each hit is checked with a primary-key EXISTS against the live and the
+    archived table, so the cost follows the number of hits rather than the
+    size of either table.
+    """
+    predicates = []
+    params = {}
+    if request_type:
+        predicates.append('sr.request_type = :request_type')
+        params['request_type'] = request_type
+    if status:
+        predicates.append('sr.status = :status')
+        params['status'] = status
+    if not predicates:
+        return '', params
+    condition = ' AND '.join([f'sr.id = {id_column}'] + predicates)
+    exists = ' OR '.join(f'EXISTS (SELECT 1 FROM {name} sr WHERE {condition})' for name in _REQUEST_TABLES)
+    return f' AND ({exists})', params
+
+
+def search_request_ids(db, query_text, limit=100, request_type=None, status=None):
+    """Return request ids matching `query_text`, best match first
+
+    The type and status filters are applied inside the index query, so the
+    `limit` window holds the best matches that pass them. Returns None when
+    no search index is available so the caller can fall back to plain
+    filtering.
+    """
+    conn = db.session.connection()
+    if not _index_available(conn):
+        return None
+    terms = _terms(query_text)
+    if not terms:
+        return []
+
+    if _backend(conn) == 'fts5':
+        # Every term must match, each as a prefix; bm25 weights favour the token
+        where, params = _state_filter(f'{SEARCH_TABLE}.rowid', request_type, status)
+        match = ' '.join(f'"{term}"*' for term in terms)
+        rows = conn.execute(text(
+            f"SELECT rowid FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH :match{where} "
+            f"ORDER BY bm25({SEARCH_TABLE}, 10.0, 8.0, 5.0, 3.0, 1.0, 1.0) LIMIT :limit"
+        ), {'match': match, 'limit': limit, **params})
+    else:
+        where, params = _state_filter(f'{SEARCH_TABLE}.request_id', request_type, status)
+        rows = conn.execute(text(f"""
+            SELECT {SEARCH_TABLE}.request_id FROM {SEARCH_TABLE}
+            CROSS JOIN to_tsquery('simple', :tsquery) AS query
+            WHERE (tsv @@ query OR document ILIKE :like){where}
+            ORDER BY ts_rank(tsv, query) + similarity(document, :raw) DESC
+            LIMIT :limit
+        """), {
+            'tsquery': ' & '.join(f"'{term}':*" for term in terms),
+            'like': f'%{query_text}%',
+            'raw': query_text,
+            'limit': limit,
+            **params
+        })
+    return [row[0] for row in rows]
+
+
+def search_match_select(db, query_text):
+    """Unranked select() of every request id matching `query_text`, for use in IN
+
+    Unlike search_request_ids() there is no window, so an export sees every
+    match. Returns None when no search index is available.
+    """
+    conn = db.session.connection()
+    if not _index_available(conn):
+        return None
+    terms = _terms(query_text)
+    if not terms:
+        return text("SELECT NULL WHERE 1 = 0").columns(column('id'))
+
+    if _backend(conn) == 'fts5':
+        return text(
+            f"SELECT rowid AS id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :search_match"
+        ).bindparams(search_match=' '.join(f'"{term}"*' for term in terms)).columns(column('id'))
+    return text(f"""
+        SELECT request_id AS id FROM {SEARCH_TABLE}
+        WHERE tsv @@ to_tsquery('simple', :search_tsquery) OR document ILIKE :search_like
+    """).bindparams(
+        search_tsquery=' & '.join(f"'{term}':*" for term in terms),
+        search_like=f'%{query_text}%'
+    ).columns(column('id'))
+
+
+def fallback_search_filter(Student, ServiceRequest, query_text):
+    """Unindexed ILIKE filter used when no search backend is available"""
+    pattern = f'%{query_text}%'
+    return or_(
+        ServiceRequest.token_number.ilike(pattern),
+        ServiceRequest.from_station.ilike(pattern),
+        ServiceRequest.to_station.ilike(pattern),
+        ServiceRequest.student.has(or_(
+            Student.roll_number.ilike(pattern),
+            Student.full_name.ilike(pattern),
+            Student.email.ilike(pattern)
+        ))
+    )
+
+
+def apply_request_filters(db, statement, Student, ServiceRequest, search_query='', service_filter='',
+                          status_filter='', limit=100):
+    """Apply the worker request-list filters to a query or select()
+
+    Returns (statement, ranked_ids); ranked_ids is the best-first id window
+    when the search index answered the search, otherwise None. With
+    limit=None every match is kept (unranked), as exports need.
+    """
+    ranked_ids = None
+    if search_query:
+        if limit is None:
+            matches = search_match_select(db, search_query)
+            if matches is None:
+                statement = statement.filter(fallback_search_filter(Student, ServiceRequest, search_query))
+            else:
+                statement = statement.filter(ServiceRequest.id.in_(matches))
+        else:
+            ranked_ids = search_request_ids(db, search_query, limit=limit,
+                                            request_type=service_filter, status=status_filter)
+            if ranked_ids is None:
+                statement = statement.filter(fallback_search_filter(Student, ServiceRequest, search_query))
+            else:
+                statement = statement.filter(ServiceRequest.id.in_(ranked_ids))
+    if service_filter:
+        statement = statement.filter(ServiceRequest.request_type == service_filter)
+    if status_filter:
+        statement = statement.filter(ServiceRequest.status == status_filter)
+    return statement, ranked_ids
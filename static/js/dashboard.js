@@ -22,6 +22,9 @@ if (sidebarOverlay) {
 }
 
 function closeSidebar() {
+    if (!sidebar || !sidebarOverlay) {
+        return;
+    }
     sidebar.classList.remove('active');
     sidebarOverlay.classList.remove('active');
     document.body.style.overflow = '';
@@ -50,3 +53,129 @@ window.addEventListener('resize', function () {
         closeSidebar();
     }
 });
+
+// ==================== LIVE UPDATES ====================
+
+const liveStreamUrl = document.body.dataset.liveStream;
+
+function statusClass(status) {
+    return 'status-' + status.toLowerCase().replace(/ /g, '-');
+}
+
+function updateBadge(badge, status) {
+    badge.classList.forEach(function (name) {
+        if (name.startsWith('status-') && name !== 'status-badge') {
+            badge.classList.remove(name);
+        }
+    });
+    badge.classList.add(statusClass(status));
+    // Keep any icon inside the badge, replace only its text
+    const text = Array.from(badge.childNodes).reverse().find(node => node.nodeType === Node.TEXT_NODE);
+    if (text) {
+        text.textContent = ' ' + status + ' ';
+    } else {
+        badge.append(' ' + status + ' ');
+    }
+}
+
+function bumpCounts(fromStatus, toStatus) {
+    document.querySelectorAll('[data-live-count]').forEach(function (counter) {
+        const statuses = counter.dataset.liveCount.split(',');
+        let delta = 0;
+        if (statuses.includes('*')) {
+            delta = fromStatus ? 0 : 1;
+        } else {
+            if (fromStatus && statuses.includes(fromStatus)) delta -= 1;
+            if (statuses.includes(toStatus)) delta += 1;
+        }
+        if (delta) {
+            counter.textContent = Math.max(0, (parseInt(counter.textContent, 10) || 0) + delta);
+        }
+    });
+}
+
+function addRecentRequest(data) {
+    const list = document.getElementById('recentRequests');
+    if (!list || list.querySelector('[data-request-id="' + data.id + '"]')) {
+        return;
+    }
+    const empty = list.querySelector('.live-empty');
+    if (empty) {
+        empty.remove();
+    }
+
+    const item = document.createElement('div');
+    item.className = 'request-item';
+    item.dataset.requestId = data.id;
+    const header = document.createElement('div');
+    header.className = 'request-header-row';
+    const token = document.createElement('span');
+    token.className = 'request-token';
+    token.textContent = data.token_number;
+    const badge = document.createElement('span');
+    badge.className = 'status-badge ' + statusClass(data.status);
+    badge.textContent = data.status;
+    header.append(token, badge);
+
+    const info = document.createElement('div');
+    info.className = 'request-info';
+    [['fa-calendar', data.submitted_at], ['fa-tag', data.request_type]].forEach(function ([icon, value]) {
+        const span = document.createElement('span');
+        const i = document.createElement('i');
+        i.className = 'fas ' + icon;
+        span.append(i, ' ' + (value || ''));
+        info.append(span);
+    });
+    item.append(header, info);
+    list.prepend(item);
+
+    const limit = parseInt(list.dataset.liveLimit, 10);
+    const items = list.querySelectorAll('.request-item');
+    if (limit && items.length > limit) {
+        items[items.length - 1].remove();
+    }
+}
+
+function takeQuota(requestType) {
+    const item = document.querySelector('[data-quota-type="' + requestType + '"]');
+    if (!item) {
+        return;
+    }
+    const used = item.querySelector('[data-quota-used]');
+    const taken = (parseInt(used.textContent, 10) || 0) + 1;
+    used.textContent = taken;
+    const limit = parseInt(item.dataset.quotaLimit, 10);
+    const remaining = item.querySelector('[data-quota-remaining]');
+    if (limit && remaining) {
+        remaining.textContent = Math.max(0, limit - taken);
+        item.classList.toggle('full', taken >= limit);
+    }
+}
+
+if (liveStreamUrl && window.EventSource) {
+    // The browser reconnects on its own and resumes from the last event id
+    const source = new EventSource(liveStreamUrl);
+
+    source.addEventListener('request_updated', function (e) {
+        const data = JSON.parse(e.data);
+        document.querySelectorAll('[data-request-id="' + data.id + '"]').forEach(function (el) {
+            const badge = el.classList.contains('status-badge') ? el : el.querySelector('.status-badge');
+            if (badge) {
+                updateBadge(badge, data.status);
+            }
+        });
+        if (data.from_status !== data.status) {
+            bumpCounts(data.from_status, data.status);
+        }
+    });
+
+    source.addEventListener('request_submitted', function (e) {
+        const data = JSON.parse(e.data);
+        if (document.querySelector('[data-request-id="' + data.id + '"]')) {
+            return;
+        }
+        addRecentRequest(data);
+        bumpCounts(null, data.status);
+        takeQuota(data.request_type);
+    });
+}
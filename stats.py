@@ -0,0 +1,38 @@
+"""
+Request Statistics for StudentHub
+Dashboard counters are aggregated inside the database with a single GROUP BY
+instead of loading every request into Python
+"""
+
+from sqlalchemy import func
+
+
+def get_request_stats(db, ServiceRequest, student_id=None, archive=None):
+    """Return total, per-status and per-type request counts (one query per table)
+
+    Pass the ArchivedRequest model as `archive` to count archived requests too.
+    """
+    by_status = {}
+    by_type = {}
+    total = 0
+    for model in (ServiceRequest, archive):
+        if model is None:
+            continue
+        query = db.session.query(
+            model.status,
+            model.request_type,
+            func.count(model.id)
+        )
+        if student_id is not None:
+            query = query.filter(model.student_id == student_id)
+
+        for status, request_type, count in query.group_by(model.status, model.request_type):
+            by_status[status] = by_status.get(status, 0) + count
+            by_type[request_type] = by_type.get(request_type, 0) + count
+            total += count
+
+    return {
+        'total': total,
+        'by_status': by_status,
+        'by_type': by_type
+    }
@@ -0,0 +1,267 @@
+"""
+Content-Addressed Upload Storage for StudentHub
+Uploads are streamed to disk in chunks while being hashed, stored under sharded
+sha256 paths (ab/cd/<sha256>.<ext>) and deduplicated with a per-blob reference
+count, so identical documents are kept once and no directory grows unbounded.
+Deleting a request or replacing a document releases its references, and the
+sweeper reclaims blobs whose count reaches zero
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from sqlalchemy import event, func, inspect, or_, select, update
+from models import get_model, insert_if_missing
+
+CHUNK_SIZE = 64 * 1024
+
+# Partially written uploads live here until they are moved into place
+INCOMING_DIR = '.incoming'
+
+
+def blob_relpath(digest, extension):
+    """Sharded relative path of a blob: ab/cd/<sha256>.<ext>"""
+    return f'{digest[:2]}/{digest[2:4]}/{digest}.{extension}'
+
+
+def _stream_to_temp(stream, directory):
+    """Copy a stream to a temp file in chunks; returns (temp_path, sha256, size)"""
+    hasher = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except Exception:
+        os.remove(temp_path)
+        raise
+    return temp_path, hasher.hexdigest(), size
+
+
+def store_upload(db, file_storage, upload_folder):
+    """Store an uploaded file and return the blob path to save on the request
+
+    The extension is taken from the (already validated) client filename; the
+    name itself is never used on disk. The reference count is bumped on the
+    current session connection, so it commits or rolls back together with
+    the request row; files left behind by a rollback are reclaimed by
+    sweep_orphans().
+    """
+    UploadBlob = get_model(db, 'UploadBlob')
+    table = UploadBlob.__table__
+    extension = file_storage.filename.rsplit('.', 1)[1].lower()
+
+    incoming = os.path.join(upload_folder, INCOMING_DIR)
+    os.makedirs(incoming, exist_ok=True)
+    temp_path, digest, size = _stream_to_temp(file_storage.stream, incoming)
+
+    conn = db.session.connection()
+    existing = conn.execute(
+        table.select().with_only_columns(table.c.path).where(table.c.sha256 == digest)
+    ).scalar()
+
+    if existing and os.path.exists(os.path.join(upload_folder, existing)):
+        # Identical content is already stored - keep a single copy, and touch
+        # it so the orphan sweeper's grace period starts again
+        os.remove(temp_path)
+        relpath = existing
+        os.utime(os.path.join(upload_folder, relpath))
+    else:
+        relpath = existing or blob_relpath(digest, extension)
+        final_path = os.path.join(upload_folder, relpath)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(temp_path, final_path)
+        insert_if_missing(conn, table, {
+            'sha256': digest,
+            'path': relpath,
+            'size': size,
+            'ref_count': 0
+        }, ['sha256'])
+
+    conn.execute(
+        update(table).where(table.c.sha256 == digest).values(ref_count=table.c.ref_count + 1)
+    )
+    return relpath
+
+
+# ==================== ORPHAN SWEEPER ====================
+
+# Progress marker so each run continues where the previous one stopped
+SWEEP_CURSOR_FILE = '.sweep_cursor'
+
+# Every column that can reference a stored upload
+REFERENCE_COLUMNS = ('id_proof_path', 'photo_path', 'fee_receipt_path', 'additional_doc_path')
+
+
+def _iter_upload_files(root, start_after=(), relative=()):
+    """Yield upload file paths as component tuples, in tree order, after `start_after`"""
+    directory = os.path.join(root, *relative)
+    with os.scandir(directory) as entries:
+        names = sorted((entry.name, entry.is_dir(follow_symlinks=False)) for entry in entries)
+
+    for name, is_dir in names:
+        # Bookkeeping files at the top level are never uploads
+        if not relative and name.startswith('.') and name != INCOMING_DIR:
+            continue
+        parts = relative + (name,)
+        if is_dir:
+            # Skip subtrees that lie entirely before the cursor
+            if parts < start_after and start_after[:len(parts)] != parts:
+                continue
+            yield from _iter_upload_files(root, start_after, parts)
+        elif parts > start_after:
+            yield parts
+
+
+def release_uploads(conn, db, relpaths):
+    """Drop one reference per path on `conn` (one per occurrence)"""
+    table = get_model(db, 'UploadBlob').__table__
+    for relpath in relpaths:
+        conn.execute(
+            update(table).where(table.c.path == relpath, table.c.ref_count > 0)
+            .values(ref_count=table.c.ref_count - 1)
+        )
+
+
+_listener_installed = False
+
+
+def install_reference_tracking(db, ServiceRequest):
+    """Release blob references when the session deletes a request or replaces a document"""
+    global _listener_installed
+    if _listener_installed:
+        return
+    _listener_installed = True
+
+    @event.listens_for(db.session, 'after_flush')
+    def _release_dropped_uploads(session, flush_context):
+        released = []
+        for obj in session.deleted:
+            if isinstance(obj, ServiceRequest):
+                released.extend(getattr(obj, column) for column in REFERENCE_COLUMNS)
+        for obj in session.dirty:
+            if isinstance(obj, ServiceRequest):
+                state = inspect(obj)
+                for column in REFERENCE_COLUMNS:
+                    released.extend(state.attrs[column].history.deleted)
+        released = [relpath for relpath in released if relpath]
+        if released:
+            release_uploads(session.connection(), db, released)
+
+
+def _referenced_paths(db, relpaths):
+    """Subset of `relpaths` referenced by any *_path column of live or archived requests"""
+    referenced = set()
+    for model in ('ServiceRequest', 'ArchivedRequest'):
+        table = get_model(db, model).__table__
+        for column in REFERENCE_COLUMNS:
+            referenced.update(db.session.execute(
+                table.select().with_only_columns(table.c[column]).where(table.c[column].in_(relpaths))
+            ).scalars())
+    return referenced
+
+
+def _count_references(db, relpath):
+    """Exact number of request columns (live and archived) that reference `relpath`"""
+    total = 0
+    for model in ('ServiceRequest', 'ArchivedRequest'):
+        table = get_model(db, model).__table__
+        total += db.session.execute(
+            select(func.count()).select_from(table)
+            .where(or_(*[table.c[column] == relpath for column in REFERENCE_COLUMNS]))
+        ).scalar()
+    return total
+
+
+def _reclaim(db, upload_folder, relpaths, cutoff, dry_run, summary):
+    """Delete the unreferenced files among `relpaths` last touched before `cutoff`"""
+    blobs = get_model(db, 'UploadBlob').__table__
+    referenced = _referenced_paths(db, relpaths)
+    for relpath in relpaths:
+        if relpath in referenced:
+            continue
+        full_path = os.path.join(upload_folder, relpath)
+        try:
+            stat = os.stat(full_path)
+        except FileNotFoundError:
+            if not dry_run:
+                db.session.execute(blobs.delete().where(blobs.c.path == relpath, blobs.c.ref_count <= 0))
+            continue
+        if stat.st_mtime > cutoff:
+            continue
+        if not dry_run:
+            os.remove(full_path)
+            db.session.execute(blobs.delete().where(blobs.c.path == relpath))
+        summary['deleted'] += 1
+        summary['reclaimed_bytes'] += stat.st_size
+    if not dry_run:
+        db.session.commit()
+    return referenced
+
+
+def sweep_orphans(db, upload_folder, grace_seconds=86400, max_files=2000, dry_run=False):
+    """Delete unreferenced upload files older than the grace period
+
+    Blobs whose reference count dropped to zero are reclaimed first. Then at
+    most `max_files` entries of uploads/ are scanned, resuming from the
+    cursor left by the previous call and wrapping around after the last
+    file; this catches files without a blob row (legacy uploads, rolled-back
+    submissions). Only unreferenced candidates are stat()ed. Returns a
+    summary dict.
+    """
+    cursor_path = os.path.join(upload_folder, SWEEP_CURSOR_FILE)
+    start_after = ()
+    if os.path.exists(cursor_path):
+        with open(cursor_path) as fh:
+            saved = fh.read().strip()
+        start_after = tuple(saved.split('/')) if saved else ()
+
+    blobs = get_model(db, 'UploadBlob').__table__
+    cutoff = time.time() - grace_seconds
+    summary = {'released': 0, 'scanned': 0, 'deleted': 0, 'reclaimed_bytes': 0, 'completed_pass': False}
+
+    # Released blobs: the count says nobody needs them, the columns confirm it
+    released = db.session.execute(
+        select(blobs.c.path).where(blobs.c.ref_count <= 0).order_by(blobs.c.path).limit(max_files)
+    ).scalars().all()
+    if released:
+        summary['released'] = len(released)
+        still_used = _reclaim(db, upload_folder, released, cutoff, dry_run, summary)
+        if still_used and not dry_run:
+            # Referenced without being counted (e.g. bulk-imported rows) - repair the count
+            for relpath in still_used:
+                db.session.execute(
+                    update(blobs).where(blobs.c.path == relpath)
+                    .values(ref_count=_count_references(db, relpath))
+                )
+            db.session.commit()
+
+    files = _iter_upload_files(upload_folder, start_after)
+    last = None
+    while summary['scanned'] < max_files:
+        batch = []
+        for parts in files:
+            relpath = '/'.join(parts)
+            if dry_run and relpath in released:
+                continue
+            batch.append(relpath)
+            if len(batch) >= min(500, max_files - summary['scanned']):
+                break
+        if not batch:
+            summary['completed_pass'] = True
+            break
+        summary['scanned'] += len(batch)
+        last = batch[-1]
+        _reclaim(db, upload_folder, batch, cutoff, dry_run, summary)
+
+    if not dry_run:
+        with open(cursor_path, 'w') as fh:
+            fh.write('' if summary['completed_pass'] or last is None else last)
+    return summary
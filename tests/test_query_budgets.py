@@ -0,0 +1,15 @@
+"""
+Query budgets - every route must stay within its SQL statement budget in
+benchmarks/query_budgets.json (refresh with `python -m benchmarks.budget --update`)
+"""
+
+from benchmarks.budget import uncovered_endpoints
+
+
+def test_route_budgets(route_case, budget_runner, route_budgets):
+    assert route_case.name in route_budgets, f'{route_case.name} has no budget'
+    budget_runner.check(route_case, route_budgets[route_case.name])
+
+
+def test_every_endpoint_has_a_case(budget_runner):
+    assert uncovered_endpoints(budget_runner.app) == []
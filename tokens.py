@@ -0,0 +1,139 @@
+"""
+Token Number Allocation for StudentHub
+Sequence numbers come from a per-(type, year) counter row that is advanced with
+an atomic UPDATE, so allocation cost does not grow with yearly volume and two
+workers can never hand out the same token
+"""
+
+import os
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import update, select, func
+from models import TOKEN_PREFIXES, get_model, insert_if_missing
+
+# Per-process token blocks: (request_type, year) -> [next_value, last_value, pid]
+_blocks = {}
+_blocks_lock = threading.Lock()
+
+
+def format_token(request_type, year, sequence):
+    """Format a sequence number as PREFIX-YEAR-NNNN"""
+    prefix = TOKEN_PREFIXES.get(request_type, 'SR')
+    return f"{prefix}-{year}-{sequence:04d}"
+
+
+def _highest_issued(conn, ServiceRequest, request_type, year):
+    """Highest sequence already issued, used to seed a new counter row"""
+    table = ServiceRequest.__table__
+    prefix = TOKEN_PREFIXES.get(request_type, 'SR')
+    # Longest then lexically greatest, so 10000 sorts after 9999
+    token = conn.execute(
+        select(table.c.token_number)
+        .where(table.c.token_number.like(f'{prefix}-{year}-%'))
+        .order_by(func.length(table.c.token_number).desc(), table.c.token_number.desc())
+        .limit(1)
+    ).scalar()
+    if token is None:
+        return 0
+    try:
+        return int(token.rsplit('-', 1)[1])
+    except ValueError:
+        return 0
+
+
+def reserve_sequence(conn, db, request_type, year, count=1):
+    """Atomically advance the counter by `count` and return the last value reserved
+
+    The caller owns the transaction on `conn`; the counter row stays locked
+    until it commits, and a rollback hands the numbers back.
+    """
+    table = get_model(db, 'TokenCounter').__table__
+    match = (table.c.request_type == request_type) & (table.c.year == year)
+    bump = update(table).where(match).values(last_value=table.c.last_value + count)
+
+    if conn.execute(bump).rowcount == 0:
+        # First token of this type this year - seed from any existing rows,
+        # archived ones included since tokens stay unique across both tables
+        seed = max(_highest_issued(conn, get_model(db, model), request_type, year)
+                   for model in ('ServiceRequest', 'ArchivedRequest'))
+        insert_if_missing(conn, table, {
+            'request_type': request_type,
+            'year': year,
+            'last_value': seed
+        }, ['request_type', 'year'])
+        conn.execute(bump)
+
+    return conn.execute(select(table.c.last_value).where(match)).scalar_one()
+
+
+def advance_sequence(conn, db, request_type, year, value):
+    """Raise the counter to at least `value` (a sequence issued outside allocation)
+
+    Used when rows arrive with their own tokens, so the next reserved number
+    never collides with them. Never lowers the counter.
+    """
+    table = get_model(db, 'TokenCounter').__table__
+    match = (table.c.request_type == request_type) & (table.c.year == year)
+    raise_to = update(table).where(match & (table.c.last_value < value)).values(last_value=value)
+
+    if conn.execute(raise_to).rowcount == 0:
+        # Either already high enough, or no counter row yet - seed it like reserve_sequence
+        seed = max(_highest_issued(conn, get_model(db, model), request_type, year)
+                   for model in ('ServiceRequest', 'ArchivedRequest'))
+        insert_if_missing(conn, table, {
+            'request_type': request_type,
+            'year': year,
+            'last_value': max(seed, value)
+        }, ['request_type', 'year'])
+        conn.execute(raise_to)
+
+
+def parse_token(token):
+    """(request_type, year, sequence) of a PREFIX-YEAR-NNNN token, or None"""
+    try:
+        prefix, year, sequence = token.split('-')
+        year, sequence = int(year), int(sequence)
+    except (AttributeError, ValueError):
+        return None
+    for request_type, type_prefix in TOKEN_PREFIXES.items():
+        if type_prefix == prefix:
+            return request_type, year, sequence
+    return None
+
+
+def _next_from_block(db, request_type, year, block_size):
+    """Hand out the next number from this process's reserved block"""
+    key = (request_type, year)
+    pid = os.getpid()
+    with _blocks_lock:
+        block = _blocks.get(key)
+        # Blocks inherited across a fork belong to the parent process
+        if block is None or block[2] != pid or block[0] > block[1]:
+            # Reserve in its own short transaction so the row is not held
+            with db.engine.begin() as conn:
+                last = reserve_sequence(conn, db, request_type, year, block_size)
+            block = [last - block_size + 1, last, pid]
+            _blocks[key] = block
+        sequence = block[0]
+        block[0] += 1
+        return sequence
+
+
+def allocate_token(db, request_type):
+    """Allocate the next token number for a request type
+
+    With TOKEN_BLOCK_SIZE = 1 (default) the counter is advanced inside the
+    current session transaction, so tokens are gap-free and rolled back with
+    the request. Larger values reserve blocks per worker process, trading gaps
+    after restarts for fewer counter writes.
+    """
+    year = datetime.now().year
+    block_size = current_app.config.get('TOKEN_BLOCK_SIZE', 1)
+
+    if block_size > 1:
+        sequence = _next_from_block(db, request_type, year, block_size)
+    else:
+        sequence = reserve_sequence(db.session.connection(), db, request_type, year)
+
+    return format_token(request_type, year, sequence)
@@ -0,0 +1,96 @@
+"""
+Request Status Workflow for StudentHub
+Status transitions for one or many service requests are applied with a single
+set-based UPDATE that also stamps the workflow timestamps and the processing
+worker, reporting the outcome per request id. Each transition is appended to
+the status event log, feeds the turnaround rollups and is pushed live to the
+student and to workers once the transaction commits
+"""
+
+from datetime import datetime
+from sqlalchemy import case, select, update
+from analytics import record_durations, record_events, transition_samples
+from livefeed import WORKERS, queue_event, request_payload, student_audience
+
+REQUEST_STATUSES = ('Submitted', 'In Progress', 'Ready', 'Collected')
+
+# Largest selection accepted by one bulk action
+MAX_BULK_REQUESTS = 500
+
+
+def transition_values(table, new_status, worker_id, now):
+    """SET clause for moving rows of `table` to `new_status`
+
+    processed_at and ready_at keep the first time a request reached that
+    stage; collected_at records the latest collection.
+    """
+    reached = REQUEST_STATUSES.index(new_status)
+    values = {
+        'status': new_status,
+        'processed_by': worker_id,
+        'updated_at': now
+    }
+    if reached >= REQUEST_STATUSES.index('In Progress'):
+        values['processed_at'] = case((table.c.processed_at.is_(None), now), else_=table.c.processed_at)
+    if reached >= REQUEST_STATUSES.index('Ready'):
+        values['ready_at'] = case((table.c.ready_at.is_(None), now), else_=table.c.ready_at)
+    if new_status == 'Collected':
+        values['collected_at'] = now
+    return values
+
+
+def apply_status(db, ServiceRequest, request_ids, new_status, remarks, worker_id):
+    """Move the given requests to `new_status` in the current transaction
+
+    Returns {request_id: 'updated' | 'unchanged' | 'not_found'}. Requests
+    already in `new_status` are left alone unless remarks are given.
+    """
+    if new_status not in REQUEST_STATUSES:
+        raise ValueError(f'Unknown status: {new_status}')
+
+    table = ServiceRequest.__table__
+    request_ids = list(dict.fromkeys(int(request_id) for request_id in request_ids))
+    current = {row.id: row for row in db.session.execute(
+        select(table.c.id, table.c.student_id, table.c.token_number, table.c.status,
+               table.c.request_type, table.c.submitted_at, table.c.ready_at, table.c.collected_at)
+        .where(table.c.id.in_(request_ids))
+    )}
+
+    results = {}
+    to_update = []
+    for request_id in request_ids:
+        row = current.get(request_id)
+        if row is None:
+            results[request_id] = 'not_found'
+        elif row.status == new_status and not remarks:
+            results[request_id] = 'unchanged'
+        else:
+            results[request_id] = 'updated'
+            to_update.append(request_id)
+
+    if to_update:
+        now = datetime.utcnow()
+        values = transition_values(table, new_status, worker_id, now)
+        if remarks:
+            values['remarks'] = remarks
+        conn = db.session.connection()
+        conn.execute(update(table).where(table.c.id.in_(to_update)).values(**values))
+
+        # Remarks on a request already in this status are not a transition
+        moved = [current[request_id] for request_id in to_update if current[request_id].status != new_status]
+        record_events(conn, db, [{
+            'request_id': row.id,
+            'request_type': row.request_type,
+            'from_status': row.status,
+            'to_status': new_status,
+            'worker_id': worker_id,
+            'occurred_at': now
+        } for row in moved])
+        record_durations(conn, db, [sample for row in moved
+                                    for sample in transition_samples(row, new_status, now)])
+        for row in moved:
+            payload = request_payload(row.id, row.token_number, row.request_type, new_status,
+                                      from_status=row.status, submitted_at=row.submitted_at)
+            queue_event(db.session, student_audience(row.student_id), 'request_updated', payload)
+            queue_event(db.session, WORKERS, 'request_updated', payload)
+    return results